@@ -0,0 +1,405 @@
+"""
+爬取性能基准：本地模拟排行榜接口 + 空存储，端到端运行 NeteaseMusicCrawler
+不访问 music.163.com，默认也不连接数据库
+用法: python bench_crawl.py [--mode serial] [--playlists 31] [--tracks 100]
+                            [--latency 0.05] [--error-rate 0] [--json 结果文件]
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from config import (
+    CRAWL_CONFIG, PIPELINE_CONFIG, CHECKPOINT_CONFIG, CACHE_CONFIG,
+    BACKUP_CONFIG, SEEN_INDEX_CONFIG, METRICS_CONFIG, HTTP_CONFIG, HEDGE_CONFIG,
+    STARTUP_CONFIG,
+    PLAYLIST_IDS,
+)
+from crawler import NeteaseMusicCrawler
+from http_client import tuned_session
+
+# 计时的爬虫方法 -> 阶段名
+STAGES = {
+    'fetch_playlist': 'fetch',
+    'parse_song': 'parse',
+    'save_to_mysql': 'mysql',
+    'save_to_mongodb': 'mongodb',
+    'save_to_backup': 'backup',
+}
+
+
+def make_playlist(playlist_id, tracks):
+    """构造 playlist/detail 接口的响应，约10%的歌曲同时出现在其他榜单"""
+    songs = []
+    for rank in range(tracks):
+        song_id = 1000 + rank if rank % 10 == 0 else playlist_id * 100000 + rank
+        songs.append({
+            'id': song_id,
+            'name': f'歌曲{song_id}',
+            'artists': [{'id': song_id % 5000, 'name': f'歌手{song_id % 5000}'}],
+            'album': {'id': song_id % 20000, 'name': f'专辑{song_id % 20000}'},
+            'duration': 180000 + song_id % 120000,
+        })
+    return {'code': 200, 'result': {'id': playlist_id, 'tracks': songs}}
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    """按 server 上的配置模拟延迟和错误，返回预先生成的响应体"""
+
+    protocol_version = 'HTTP/1.1'  # 支持长连接，统计连接复用
+    disable_nagle_algorithm = True  # 响应头和响应体分两次发送，避免长连接上的延迟确认等待
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        delay = server.latency
+        if server.slow_rate and server.rng.random() < server.slow_rate:
+            delay = server.slow_latency
+        time.sleep(delay)
+
+        if url.path != '/api/playlist/detail':
+            self.send_error(404)
+            return
+        if server.error_rate and server.rng.random() < server.error_rate:
+            self.send_error(503)
+            return
+        playlist_id = int(parse_qs(url.query).get('id', ['0'])[0])
+        body = server.body(playlist_id)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    """在后台线程中运行的本地模拟接口"""
+
+    daemon_threads = True
+
+    def __init__(self, tracks=100, latency=0.05, error_rate=0.0,
+                 slow_rate=0.0, slow_latency=1.0, fixture=None, seed=0):
+        super().__init__(('127.0.0.1', 0), FakeApiHandler)
+        self.tracks = tracks
+        self.latency = latency
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.rng = random.Random(seed)
+        self.fixture = None
+        if fixture:
+            with open(fixture, 'rb') as f:
+                self.fixture = f.read()
+        self.connections = 0
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def body(self, playlist_id):
+        """指定了响应文件时所有歌单都返回该文件，否则按歌单ID生成并缓存"""
+        if self.fixture is not None:
+            return self.fixture
+        with self._lock:
+            if playlist_id not in self._bodies:
+                payload = make_playlist(playlist_id, self.tracks)
+                self._bodies[playlist_id] = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            return self._bodies[playlist_id]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class StageTimer:
+    """按阶段累计调用次数和耗时，保留每次耗时用于计算分位数"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, error=False):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+            if error:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+        return timed
+
+    def summary(self):
+        return {
+            stage: {
+                'calls': len(values),
+                'errors': self.errors.get(stage, 0),
+                'seconds': round(sum(values), 4),
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p99_ms': round(percentile(values, 99) * 1000, 2),
+            }
+            for stage, values in self.samples.items()
+        }
+
+
+def percentile(values, q):
+    """最近秩法分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(q / 100 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+class TimedSession(requests.Session):
+    """记录每次HTTP请求的耗时、状态码和响应大小"""
+
+    def __init__(self, timer):
+        super().__init__()
+        self.timer = timer
+        self.trust_env = False  # 本地请求不走代理
+        self.bytes_received = 0
+
+    def request(self, method, url, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except Exception:
+            self.timer.record('http', time.perf_counter() - started, error=True)
+            raise
+        self.timer.record('http', time.perf_counter() - started,
+                          error=response.status_code != 200)
+        self.bytes_received += len(response.content)
+        return response
+
+
+class NullSink:
+    """不写入任何地方的存储，也用作数据库连接和客户端的替身"""
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, item):
+        self.count += 1
+        return True
+
+    def cursor(self):
+        return self
+
+    def flush(self):
+        return True
+
+    def report(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class BenchCrawler(NeteaseMusicCrawler):
+    """请求发往本地模拟接口，各阶段计时；real_sinks 为False时不连接数据库"""
+
+    def __init__(self, base_url, timer, real_sinks=False):
+        self.base_url = base_url
+        self.timer = timer
+        self.real_sinks = real_sinks
+        super().__init__()
+        self.session = tuned_session(
+            TimedSession(timer),
+            pool_connections=HTTP_CONFIG['pool_connections'],
+            pool_maxsize=HTTP_CONFIG['pool_maxsize'],
+        )
+        self.http.session = self.session
+        for method, stage in STAGES.items():
+            setattr(self, method, timer.wrap(stage, getattr(self, method)))
+
+    def init_mysql(self):
+        if self.real_sinks:
+            return super().init_mysql()
+        self.mysql_conn = NullSink()
+        self.mysql_sink = NullSink()
+
+    def init_mongodb(self):
+        if self.real_sinks:
+            return super().init_mongodb()
+        self.mongo_client = NullSink()
+        self.mongo_collection = None
+        self.mongo_sink = NullSink()
+
+    def playlist_url(self, playlist_id):
+        return f'{self.base_url}/api/playlist/detail?id={playlist_id}'
+
+
+def configure(args, workdir):
+    """调整配置：去掉请求间隔(除非指定 --adaptive)，关闭缓存和索引，所有文件都写到临时目录，不改动 data/ 下的文件"""
+    CRAWL_CONFIG.update({
+        'delay_min': 0,
+        'delay_max': 0,
+        'adaptive_rate': bool(args.adaptive),
+        'max_songs': args.playlists * args.tracks,
+        'mode': args.mode,
+        'host_interval': 0,
+    })
+    if args.adaptive:
+        CRAWL_CONFIG['rate_floor'], CRAWL_CONFIG['rate_ceiling'] = args.adaptive
+    HEDGE_CONFIG['enabled'] = args.hedge
+    if args.hedge_percentile is not None:
+        HEDGE_CONFIG['percentile'] = args.hedge_percentile
+    if args.hedge_min_delay is not None:
+        HEDGE_CONFIG['min_delay'] = args.hedge_min_delay
+    if args.backoff is not None:
+        HTTP_CONFIG['backoff_base'] = args.backoff
+    PIPELINE_CONFIG['report_interval'] = 0
+    CHECKPOINT_CONFIG['path'] = os.path.join(workdir, 'checkpoint.json')
+    CACHE_CONFIG.update({'enabled': False, 'dir': os.path.join(workdir, 'http_cache')})
+    METRICS_CONFIG.update({'report_path': os.path.join(workdir, 'crawl_metrics.json'), 'prometheus_port': None})
+    SEEN_INDEX_CONFIG.update({'enabled': False, 'path': os.path.join(workdir, 'seen_songs.db')})
+    STARTUP_CONFIG['ua_pool_path'] = os.path.join(workdir, 'user_agents.json')
+    BACKUP_CONFIG.update({
+        'path': os.path.join(workdir, 'songs.jsonl'),
+        'keep_in_memory': False,
+    })
+    PLAYLIST_IDS[:] = [{'id': 100 + i, 'name': f'模拟榜单{i}'} for i in range(args.playlists)]
+
+
+def run(args):
+    server = FakeApiServer(
+        tracks=args.tracks, latency=args.latency, error_rate=args.error_rate,
+        slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+        fixture=args.fixture, seed=args.seed,
+    ).start()
+    timer = StageTimer()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            configure(args, workdir)
+            crawler = BenchCrawler(server.base_url, timer, real_sinks=args.real_sinks)
+            output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+            try:
+                started = time.perf_counter()
+                with output:
+                    if args.mode == 'async':
+                        total = crawler.crawl_async()
+                    elif args.mode == 'pipeline':
+                        total = crawler.crawl_pipelined()
+                    else:
+                        total = crawler.crawl()
+                elapsed = time.perf_counter() - started
+            finally:
+                crawler.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    stages = timer.summary()
+    http = stages.get('http', {'calls': 0, 'errors': 0, 'p50_ms': 0.0, 'p99_ms': 0.0})
+    return {
+        'mode': args.mode,
+        'playlists': args.playlists,
+        'tracks': args.tracks,
+        'latency': args.latency,
+        'error_rate': args.error_rate,
+        'records': total,
+        'seconds': round(elapsed, 4),
+        'records_per_second': round(total / elapsed, 1) if elapsed else 0.0,
+        'time_to_first_request_ms': round((crawler.metrics.time_to_first_request() or 0.0) * 1000, 1),
+        'requests': http['calls'],
+        'request_errors': http['errors'],
+        'retries': crawler.metrics.counters['retries'],
+        'bytes_received': crawler.session.bytes_received,
+        'connections': server.connections,
+        'latency_p50_ms': http['p50_ms'],
+        'latency_p99_ms': http['p99_ms'],
+        'stages': stages,
+        'counters': crawler.metrics.report()['counters'],
+        'adaptive_rate': {
+            'final': round(crawler.rate.rate, 3),
+            'max': round(crawler.rate.max_rate, 3),
+            'min': round(crawler.rate.min_rate, 3),
+            'backoffs': crawler.rate.backoffs,
+        } if crawler.rate else None,
+        'hedging': crawler.http.hedger.summary() if crawler.http.hedger else None,
+    }
+
+
+def print_report(result):
+    print(f"模式: {result['mode']}, 歌单 {result['playlists']} 个 x {result['tracks']} 首, "
+          f"模拟延迟 {result['latency'] * 1000:.0f} ms, 错误率 {result['error_rate'] * 100:.1f}%")
+    print(f"  入库 {result['records']} 首, 耗时 {result['seconds']:.2f} 秒, "
+          f"{result['records_per_second']:.1f} 条/秒, 创建爬虫到第一个请求 {result['time_to_first_request_ms']:.1f} ms")
+    print(f"  请求 {result['requests']} 次 (失败 {result['request_errors']} 次, 重试 {result['retries']} 次), "
+          f"连接 {result['connections']} 个, 接收 {result['bytes_received'] / 1024:.1f} KB, "
+          f"延迟 p50 {result['latency_p50_ms']:.1f} ms, p99 {result['latency_p99_ms']:.1f} ms")
+    if result['adaptive_rate']:
+        rate = result['adaptive_rate']
+        print(f"  自适应限速: 最终 {rate['final']:.2f} 次/秒, 最高 {rate['max']:.2f}, "
+              f"最低 {rate['min']:.2f}, 降速 {rate['backoffs']} 次")
+    if result['hedging']:
+        hedging = result['hedging']
+        print(f"  对冲请求: {hedging['hedged']} 次 ({hedging['hedge_rate'] * 100:.1f}%), "
+              f"备份先返回 {hedging['backup_wins']} 次, "
+              f"p99 {hedging['primary_p99_ms']:.1f} ms -> {hedging['observed_p99_ms']:.1f} ms")
+    print("  各阶段:")
+    for stage, stats in result['stages'].items():
+        print(f"    - {stage:<8} {stats['calls']:>7} 次, 共 {stats['seconds']:7.3f} 秒, "
+              f"p50 {stats['p50_ms']:8.3f} ms, p99 {stats['p99_ms']:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='网易云音乐爬虫性能基准(本地模拟接口)')
+    parser.add_argument('--mode', choices=['serial', 'async', 'pipeline'], default='serial')
+    parser.add_argument('--playlists', type=int, default=len(PLAYLIST_IDS), help='歌单数量')
+    parser.add_argument('--tracks', type=int, default=100, help='每个歌单的歌曲数')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟响应延迟(秒)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回503的比例')
+    parser.add_argument('--slow-rate', type=float, default=0.0, help='慢响应的比例')
+    parser.add_argument('--slow-latency', type=float, default=1.0, help='慢响应的延迟(秒)')
+    parser.add_argument('--fixture', help='响应文件，所有歌单都返回该文件的内容')
+    parser.add_argument('--adaptive', nargs=2, type=float, metavar=('FLOOR', 'CEILING'),
+                        help='开启自适应限速并指定最低/最高速率(次/秒)，默认不限速')
+    parser.add_argument('--hedge', action='store_true', help='开启对冲请求(参数见 HEDGE_CONFIG)')
+    parser.add_argument('--hedge-percentile', type=float, help='对冲等待时间取的耗时分位数，默认使用 HEDGE_CONFIG')
+    parser.add_argument('--hedge-min-delay', type=float, help='对冲前至少等待的秒数，默认使用 HEDGE_CONFIG')
+    parser.add_argument('--backoff', type=float, help='重试退避基数(秒)，默认使用 HTTP_CONFIG')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--real-sinks', action='store_true',
+                        help='写入 config.py 中配置的 MySQL 和 MongoDB，默认使用空存储')
+    parser.add_argument('--json', help='把结果另存为JSON文件，便于前后对比')
+    parser.add_argument('--verbose', action='store_true', help='保留爬虫自身的输出')
+    args = parser.parse_args()
+
+    result = run(args)
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"✓ 结果已保存到 {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+记录类型内存对比：dict 与 __slots__ 记录
+用法: python bench_records.py [记录数，默认1000000]
+"""
+import sys
+import time
+import tracemalloc
+
+from records import Song
+
+REPEAT = 3  # 计时重复次数，取最快的一次
+
+
+def make_dict(i):
+    return {
+        'song_id': 1000000 + i,
+        'song_name': f'歌曲{i}',
+        'artist_name': f'歌手{i % 5000}',
+        'artist_id': i % 5000,
+        'album_name': f'专辑{i % 20000}',
+        'album_id': i % 20000,
+        'duration': 180 + i % 120,
+        'playlist_name': '热歌榜',
+        'playlist_id': 3778678,
+        'rank_num': i % 200 + 1,
+    }
+
+
+def make_record(i):
+    return Song(**make_dict(i))
+
+
+def build(factory, values):
+    if factory is None:
+        return [dict(v) for v in values]
+    return [factory(**v) for v in values]
+
+
+def measure(name, factory, n, repeat=REPEAT):
+    """返回 (构建耗时, 容器与记录本身占用的字节数)
+
+    tracemalloc 会明显拖慢大量小对象的分配，耗时取不开启跟踪的 repeat 次构建中最快的一次，
+    占用在另一次开启 tracemalloc 的构建中统计
+    """
+    # 先构建字段值，只统计记录结构本身的开销
+    values = [make_dict(i) for i in range(n)]
+    elapsed = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        records = build(factory, values)
+        elapsed = min(elapsed, time.perf_counter() - started)
+        del records
+
+    tracemalloc.start()
+    records = build(factory, values)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    print(f"  {name:<12} 构建 {elapsed:6.2f} 秒, 占用 {size / 1024 / 1024:8.1f} MB, "
+          f"每条 {size / n:6.1f} 字节")
+    return elapsed, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print(f"记录数: {n}")
+    dict_time, dict_size = measure('dict', None, n)
+    slot_time, slot_size = measure('Song', Song, n)
+    print(f"  __slots__ 记录构建耗时为 dict 的 {slot_time / dict_time * 100:.1f}%，"
+          f"占用为 dict 的 {slot_size / dict_size * 100:.1f}%")
+
+    song = make_record(0)
+    started = time.perf_counter()
+    for _ in range(n):
+        song.to_row()
+    print(f"  to_row: {(time.perf_counter() - started) / n * 1e9:.0f} ns/条")
+    started = time.perf_counter()
+    for _ in range(n):
+        song.to_document()
+    print(f"  to_document: {(time.perf_counter() - started) / n * 1e9:.0f} ns/条")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+清洗结果的列式存储(Parquet / Arrow IPC 分片数据集)
+"""
+import os
+
+import pandas as pd
+
+# arrow 格式中以字符串保存的类别字段的元数据标记
+CATEGORY_KEY = b'categorical'
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.fs
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("列式输出需要先安装 pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def dataset_parts(path):
+    """数据集目录中已写完的分片文件，按写入顺序排列"""
+    if not os.path.isdir(path):
+        return []
+    ext = os.path.splitext(path)[1]
+    names = sorted(name for name in os.listdir(path) if name.startswith('part-') and name.endswith(ext))
+    return [os.path.join(path, name) for name in names]
+
+
+class ColumnarWriter:
+    """
+    逐块写入列式数据集，path 为数据集目录，每次运行写一个分片文件 part-<序号>
+    append 为True时在已有分片之后新增一个分片，已有分片不再读取或改写；
+    否则写完后删除旧分片，只保留本次的结果
+    分片先写入临时文件，写完后再改为正式文件名
+    parquet 按 row_group_size 行一个行组并记录每组的最小/最大值统计
+    arrow 为 Arrow IPC 文件格式，不压缩时可内存映射零拷贝读取
+    """
+
+    def __init__(self, path, fmt='parquet', compression='zstd', row_group_size=100000, append=False):
+        self.pa = _pyarrow()
+        self.path = path
+        self.fmt = fmt
+        self.compression = compression
+        self.row_group_size = row_group_size
+        # 旧版本输出的单个文件不能追加分片，按全量输出替换
+        self.append = append and os.path.isdir(path)
+        parts = dataset_parts(path) if self.append else []
+        number = int(os.path.basename(parts[-1]).split('.')[0][len('part-'):]) + 1 if parts else 0
+        self.part_path = os.path.join(path, f'part-{number:05d}{os.path.splitext(path)[1]}')
+        self.tmp_path = self.part_path + '.tmp'
+        self.schema = None
+        self.writer = None
+        self.pending = []
+        self.pending_rows = 0
+        self.count = 0
+
+    def _unify_schema(self, schema):
+        """各块的类别字段索引宽度可能不同，全部空值的字段没有类型，统一成固定类型
+
+        Arrow IPC 文件中每个字段只能有一个字典，而各块的类别集合互不相同，
+        因此 arrow 格式把类别字段存为字符串并在字段元数据中标记，读取时再编码回类别
+        """
+        pa = self.pa
+        fields = []
+        for field in schema:
+            if pa.types.is_dictionary(field.type) and self.fmt == 'arrow':
+                field = field.with_type(field.type.value_type).with_metadata({CATEGORY_KEY: b'1'})
+            elif pa.types.is_dictionary(field.type):
+                field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+            elif pa.types.is_null(field.type):
+                field = field.with_type(pa.string())
+            fields.append(field)
+        return pa.schema(fields, metadata=schema.metadata)
+
+    def _open(self, schema):
+        pa = self.pa
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+        os.makedirs(self.path, exist_ok=True)
+        self.schema = self._unify_schema(schema)
+        if self.fmt == 'parquet':
+            self.writer = pa.parquet.ParquetWriter(
+                self.tmp_path, self.schema,
+                compression=self.compression or 'none',
+                write_statistics=True,
+            )
+        elif self.fmt == 'arrow':
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            self.writer = pa.ipc.new_file(self.tmp_path, self.schema, options=options)
+        else:
+            raise ValueError(f"不支持的列式格式: {self.fmt}")
+
+    def write(self, df):
+        if df.empty:
+            return
+        table = self.pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self._open(table.schema)
+        self.pending.append(table.cast(self.schema))
+        self.pending_rows += len(df)
+        self.count += len(df)
+        if self.pending_rows >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        table = self.pa.concat_tables(self.pending)
+        self.pending = []
+        self.pending_rows = 0
+        if self.fmt == 'parquet':
+            self.writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            self.writer.write_table(table, max_chunksize=self.row_group_size)
+
+    def _remove_old(self, keep=None):
+        """全量输出时删除 keep 以外的旧分片和旧版本的单个文件"""
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+        for part in dataset_parts(self.path):
+            if part != keep:
+                os.remove(part)
+
+    def close(self):
+        if self.writer is None:
+            # 全量输出没有数据时删除旧结果，避免读到上一次的结果
+            if not self.append:
+                self._remove_old()
+                if os.path.isdir(self.path) and not os.listdir(self.path):
+                    os.rmdir(self.path)
+            return
+        self._flush()
+        self.writer.close()
+        # 先换上新分片再删除旧分片，中途出错时不会没有任何列式结果
+        os.replace(self.tmp_path, self.part_path)
+        if not self.append:
+            self._remove_old(keep=self.part_path)
+
+
+def read_columnar(path, columns=None):
+    """把数据集的全部分片作为一个数据集读取部分字段，Parquet 与 Arrow 文件都通过内存映射读取"""
+    pa = _pyarrow()
+    fmt = 'parquet' if path.endswith('.parquet') else 'ipc'
+    filesystem = pa.fs.LocalFileSystem(use_mmap=True)
+    table = pa.dataset.dataset(dataset_parts(path), format=fmt, filesystem=filesystem).to_table(columns=columns)
+    for i, field in enumerate(table.schema):
+        if field.metadata and CATEGORY_KEY in field.metadata:
+            table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+    df = table.to_pandas()
+    # 各分片、各块的类别集合合并在一起，去掉数据中没有出现的类别
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.remove_unused_categories()
+    return df
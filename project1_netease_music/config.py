@@ -8,18 +8,137 @@ MYSQL_CONFIG = {
     'charset': 'utf8mb4'
 }
 
+# MySQL批量写入配置，batch_size 设为 1 即为逐条写入并提交
+MYSQL_BATCH_CONFIG = {
+    'batch_size': 100,  # 每批写入的行数
+    'flush_interval': 2.0,  # 缓冲区最长保留时间(秒)
+}
+
 MONGODB_CONFIG = {
     'host': 'localhost',
     'port': 27017,
     'database': 'netease_music',
-    'collection': 'songs'
+    'collection': 'songs',
+    'bulk_write': True,  # 使用 bulk_write 批量 upsert，False 为逐条 update_one
+    'bulk_batch_size': 500,  # 每批发送的操作数
 }
 
 # 爬虫配置
 CRAWL_CONFIG = {
     'delay_min': 2,
     'delay_max': 4,
+    'adaptive_rate': True,  # 按响应情况自动调整请求速率，False 时每次请求后随机等待 delay_min~delay_max 秒
+    'rate_floor': 0.25,  # 最低请求速率(次/秒)，也是起始速率
+    'rate_ceiling': 1.0,  # 最高请求速率(次/秒)
+    'rate_increase': 0.05,  # 每次正常响应后增加的速率(次/秒)
+    'rate_decrease': 0.5,  # 遇到 403/429/5xx、请求异常或慢响应时速率乘以该系数
+    'slow_latency': 5.0,  # 响应超过该耗时(秒)视为服务器变慢
     'max_songs': 1500,  # 最大爬取歌曲数
+    'mode': 'serial',  # 爬取模式: serial 串行 / async 并发 / pipeline 流水线
+    'concurrency': 4,  # async模式下同时进行的请求上限
+    'host_concurrency': 2,  # 同一主机同时进行的请求上限
+    'host_interval': 1.0,  # 同一主机相邻请求的最小间隔(秒)
+}
+
+# 启动配置：数据库在第一次写入时才连接，User-Agent 从本地预先生成的列表中选取
+STARTUP_CONFIG = {
+    'lazy_connect': True,  # 设为 False 时启动即连接数据库，配置错误能在爬取前发现
+    'ua_pool_path': 'data/user_agents.json',
+    'ua_pool_size': 200,
+    'ua_pool_ttl': 7 * 24 * 3600,  # 列表超过该时间(秒)后重新生成
+}
+
+# HTTP连接和重试
+HTTP_CONFIG = {
+    'pool_connections': 2,  # 保留连接池的主机数
+    'pool_maxsize': 4,  # 每个主机保留的长连接数，不小于 async 模式的 concurrency
+    'connect_timeout': 3.05,  # 建立连接的超时(秒)
+    'read_timeout': 15,  # 等待响应的超时(秒)
+    'retries': 3,  # 连接错误、超时和 retry_status 的最多重试次数
+    'backoff_base': 1.0,  # 第n次重试前随机等待 0~backoff_base*2^n 秒
+    'backoff_max': 30.0,  # 单次重试等待上限(秒)
+    'retry_status': (429, 500, 502, 503, 504),
+}
+
+# 对冲请求：请求超过近期耗时的分位数仍未返回时再发一个相同的备份请求，取先返回的结果
+HEDGE_CONFIG = {
+    'enabled': False,
+    'percentile': 95,  # 等待时间取近期请求耗时的该分位数
+    'min_delay': 0.5,  # 至少等待(秒)
+    'initial_delay': 3.0,  # 样本不足 min_samples 个时的等待时间(秒)
+    'min_samples': 20,
+    'budget': 0.05,  # 备份请求数不超过请求总数的该比例
+    'workers': 8,  # 发送请求的线程数
+}
+
+# pipeline模式的队列配置
+PIPELINE_CONFIG = {
+    'queue_size': 4,  # 待解析歌单队列长度
+    'sink_queue_size': 1000,  # 每个存储队列的长度，写满后反压上游
+    'report_interval': 10,  # 输出队列深度的间隔(秒)，0 为不输出
+}
+
+# 断点续爬配置，使用 python crawler.py --resume 从断点继续
+CHECKPOINT_CONFIG = {
+    'path': 'data/checkpoint.json',
+    'interval': 5,  # 保存断点的最小间隔(秒)
+}
+
+# HTTP响应缓存，内容与上次入库时相同的榜单会跳过写库
+# 清空数据库后请删除缓存目录，否则未变化的榜单不会重新写入
+CACHE_CONFIG = {
+    'enabled': False,
+    'dir': 'data/http_cache',
+    'ttl': 3600,  # 缓存有效期(秒)，过期后用 ETag/Last-Modified 重新验证
+}
+
+# 逐条追加的JSONL备份
+BACKUP_CONFIG = {
+    'path': 'data/songs.jsonl',
+    'compression': None,  # None / 'gzip' / 'zstd'(需安装 zstandard)
+    'flush_every': 100,  # 每写入多少条刷新一次文件
+    'keep_in_memory': False,  # 为True时在内存中保留全部记录，结束时另存 data/songs.json
+}
+
+# 跨运行的已入库ID索引，已入库的歌曲直接跳过解析和写库
+# 清空数据库后请删除索引文件
+SEEN_INDEX_CONFIG = {
+    'enabled': False,
+    'path': 'data/seen_songs.db',
+    'capacity': 1000000,  # 预计ID数量，用于确定布隆过滤器大小
+    'error_rate': 0.01,  # 布隆过滤器误判率，误判时会再查一次精确索引
+}
+
+# 运行统计：各阶段耗时直方图、请求/写入计数和下载量
+METRICS_CONFIG = {
+    'report_path': 'data/crawl_metrics.json',  # 结束时写出JSON报告，None 为不写
+    'prometheus_port': None,  # 设置端口后在 http://127.0.0.1:端口/metrics 提供 Prometheus 文本格式指标
+    'namespace': 'netease_crawler',  # 指标名前缀
+}
+
+# 数据清洗
+CLEAN_CONFIG = {
+    'chunked': False,  # 为True时用服务端游标分块读取，内存占用只与块大小有关
+    'chunk_size': 50000,  # 每块行数
+    'incremental': False,  # 为True时只清洗上次之后新入库的数据并合并到已有清洗结果(按块读取)
+    'state_path': 'data/clean_state.json',  # 记录已清洗到的入库时间
+    'ids_path': 'data/clean_ids.db',  # 已清洗ID的索引，增量清洗时按ID去重
+    'watermark_overlap': 60,  # 每次往前多读的秒数，重复记录按ID去重
+}
+
+# 清洗结果输出，列式格式需安装 pyarrow
+OUTPUT_CONFIG = {
+    'base_path': 'data/songs_cleaned',  # 各格式文件为 base_path 加扩展名
+    'text': True,  # 输出 CSV 和 JSON
+    'columnar': 'parquet',  # None / 'parquet' / 'arrow'(Arrow IPC)
+    'compression': 'zstd',  # parquet: snappy/gzip/zstd; arrow: None/lz4/zstd，不压缩时可零拷贝读取
+    'row_group_size': 100000,  # 每个行组/记录批的行数
+}
+
+# 可视化
+VISUALIZE_CONFIG = {
+    'workers': 4,  # 并行生成图表的进程数，1为逐个生成
+    'cache': True,  # 输入数据和绘图代码都没变的图表直接复用上次的图片
 }
 
 # 排行榜/歌单ID列表
@@ -2,72 +2,186 @@
 网易云音乐排行榜爬虫
 爬取多个排行榜的歌曲数据
 """
-import requests
+import argparse
+import asyncio
 import time
 import random
 import json
 import re
+from collections import deque
+from urllib.parse import urlparse
 from datetime import datetime
-from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
-import pymysql
-from pymongo import MongoClient
-from config import MYSQL_CONFIG, MONGODB_CONFIG, CRAWL_CONFIG, PLAYLIST_IDS
+from checkpoint import CheckpointStore
+from config import (
+    MYSQL_CONFIG, MYSQL_BATCH_CONFIG, MONGODB_CONFIG, CRAWL_CONFIG,
+    PIPELINE_CONFIG, CHECKPOINT_CONFIG, CACHE_CONFIG, BACKUP_CONFIG,
+    SEEN_INDEX_CONFIG, METRICS_CONFIG, HTTP_CONFIG, HEDGE_CONFIG, STARTUP_CONFIG, PLAYLIST_IDS,
+)
+from http_cache import ResponseCache
+from http_client import Hedger, HttpClient, tuned_session
+from metrics import CrawlMetrics
+from pipeline import CrawlPipeline
+from seen_index import SeenIndex
+from records import Song
+from storage import JsonlWriter, LazyConnection, MongoBulkSink, MySQLBatchSink
+from throttle import AdaptiveRate, HostThrottle
+from ua_pool import UserAgentPool
+
+INSERT_SONG_SQL = """
+INSERT IGNORE INTO songs 
+(song_id, song_name, artist_name, artist_id, album_name, album_id, 
+ duration, playlist_name, playlist_id, rank_num)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+CREATE_SONGS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS songs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    song_id BIGINT UNIQUE,
+    song_name VARCHAR(500),
+    artist_name VARCHAR(500),
+    artist_id BIGINT,
+    album_name VARCHAR(500),
+    album_id BIGINT,
+    duration INT,
+    playlist_name VARCHAR(200),
+    playlist_id BIGINT,
+    rank_num INT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
 
 
 class NeteaseMusicCrawler:
     def __init__(self):
-        self.ua = UserAgent()
-        self.session = requests.Session()
+        self.metrics = CrawlMetrics(METRICS_CONFIG.get('namespace', 'crawler'))
+        self.ua = UserAgentPool(
+            STARTUP_CONFIG['ua_pool_path'],
+            size=STARTUP_CONFIG['ua_pool_size'],
+            ttl=STARTUP_CONFIG['ua_pool_ttl'],
+        )
+        self.session = tuned_session(
+            pool_connections=HTTP_CONFIG['pool_connections'],
+            pool_maxsize=HTTP_CONFIG['pool_maxsize'],
+        )
+        self.rate = None
+        if CRAWL_CONFIG.get('adaptive_rate'):
+            self.rate = AdaptiveRate(
+                CRAWL_CONFIG['rate_floor'], CRAWL_CONFIG['rate_ceiling'],
+                increase=CRAWL_CONFIG.get('rate_increase', 0.05),
+                decrease=CRAWL_CONFIG.get('rate_decrease', 0.5),
+                slow_latency=CRAWL_CONFIG.get('slow_latency', 5.0),
+            )
         self.songs = []
+        self.backup = None
+        if METRICS_CONFIG.get('prometheus_port'):
+            self.metrics.serve(METRICS_CONFIG['prometheus_port'])
+        self.checkpoint = CheckpointStore(
+            CHECKPOINT_CONFIG['path'], CHECKPOINT_CONFIG['interval']
+        )
+        self.http_cache = None
+        if CACHE_CONFIG.get('enabled'):
+            self.http_cache = ResponseCache(CACHE_CONFIG['dir'], CACHE_CONFIG['ttl'])
+        hedger = None
+        if HEDGE_CONFIG.get('enabled'):
+            hedger = Hedger(
+                percentile=HEDGE_CONFIG['percentile'],
+                budget=HEDGE_CONFIG['budget'],
+                min_delay=HEDGE_CONFIG['min_delay'],
+                initial_delay=HEDGE_CONFIG['initial_delay'],
+                min_samples=HEDGE_CONFIG['min_samples'],
+                workers=HEDGE_CONFIG['workers'],
+            )
+            self.metrics.attach('hedging', hedger.summary)
+        self.http = HttpClient(
+            self.session, self.metrics,
+            headers=self.get_headers,
+            rate=self.rate,
+            cache=self.http_cache,
+            connect_timeout=HTTP_CONFIG['connect_timeout'],
+            read_timeout=HTTP_CONFIG['read_timeout'],
+            retries=HTTP_CONFIG['retries'],
+            backoff_base=HTTP_CONFIG['backoff_base'],
+            backoff_max=HTTP_CONFIG['backoff_max'],
+            retry_status=HTTP_CONFIG['retry_status'],
+            hedger=hedger,
+        )
+        self.seen_index = None
+        self.known_skipped = 0
+        if SEEN_INDEX_CONFIG.get('enabled'):
+            self.seen_index = SeenIndex(
+                SEEN_INDEX_CONFIG['path'],
+                capacity=SEEN_INDEX_CONFIG['capacity'],
+                error_rate=SEEN_INDEX_CONFIG['error_rate'],
+            )
         self.init_mysql()
         self.init_mongodb()
     
     def init_mysql(self):
-        """初始化MySQL数据库"""
-        conn = pymysql.connect(
-            host=MYSQL_CONFIG['host'],
-            port=MYSQL_CONFIG['port'],
-            user=MYSQL_CONFIG['user'],
-            password=MYSQL_CONFIG['password'],
-            charset=MYSQL_CONFIG['charset']
+        """创建MySQL批量写入器，lazy_connect 时在第一次写入时才连接"""
+        self.mysql_conn = LazyConnection(self.connect_mysql)
+        self.mysql_sink = MySQLBatchSink(
+            self.mysql_conn, INSERT_SONG_SQL,
+            batch_size=MYSQL_BATCH_CONFIG['batch_size'],
+            flush_interval=MYSQL_BATCH_CONFIG['flush_interval'],
+            metrics=self.metrics,
         )
+        if not STARTUP_CONFIG.get('lazy_connect', True):
+            self.mysql_conn.get()
+    
+    def connect_mysql(self):
+        """连接MySQL，数据库或数据表不存在时才创建"""
+        import pymysql
+        try:
+            conn = pymysql.connect(**MYSQL_CONFIG)
+        except pymysql.OperationalError as e:
+            if e.args[0] != 1049:  # Unknown database
+                raise
+            server = pymysql.connect(
+                host=MYSQL_CONFIG['host'],
+                port=MYSQL_CONFIG['port'],
+                user=MYSQL_CONFIG['user'],
+                password=MYSQL_CONFIG['password'],
+                charset=MYSQL_CONFIG['charset']
+            )
+            cursor = server.cursor()
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {MYSQL_CONFIG['database']}")
+            server.close()
+            conn = pymysql.connect(**MYSQL_CONFIG)
+        
         cursor = conn.cursor()
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {MYSQL_CONFIG['database']}")
-        conn.close()
-        
-        self.mysql_conn = pymysql.connect(**MYSQL_CONFIG)
-        self.mysql_cursor = self.mysql_conn.cursor()
-        
-        create_table_sql = """
-        CREATE TABLE IF NOT EXISTS songs (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            song_id BIGINT UNIQUE,
-            song_name VARCHAR(500),
-            artist_name VARCHAR(500),
-            artist_id BIGINT,
-            album_name VARCHAR(500),
-            album_id BIGINT,
-            duration INT,
-            playlist_name VARCHAR(200),
-            playlist_id BIGINT,
-            rank_num INT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-        """
-        self.mysql_cursor.execute(create_table_sql)
-        self.mysql_conn.commit()
+        if not cursor.execute("SHOW TABLES LIKE 'songs'"):
+            cursor.execute(CREATE_SONGS_TABLE_SQL)
+            conn.commit()
+        cursor.close()
         print("✓ MySQL数据库初始化完成")
+        return conn
     
     def init_mongodb(self):
-        """初始化MongoDB"""
-        self.mongo_client = MongoClient(
+        """创建MongoDB写入器，lazy_connect 时在第一次写入时才连接"""
+        self.mongo_client = LazyConnection(self.connect_mongodb)
+        self.mongo_collection = LazyConnection(
+            lambda: self.mongo_client.get()[MONGODB_CONFIG['database']][MONGODB_CONFIG['collection']]
+        )
+        self.mongo_sink = None
+        if MONGODB_CONFIG.get('bulk_write'):
+            self.mongo_sink = MongoBulkSink(
+                self.mongo_collection, 'song_id',
+                batch_size=MONGODB_CONFIG.get('bulk_batch_size', 500),
+                metrics=self.metrics,
+            )
+        if not STARTUP_CONFIG.get('lazy_connect', True):
+            self.mongo_collection.get()
+    
+    def connect_mongodb(self):
+        """连接MongoDB"""
+        from pymongo import MongoClient
+        client = MongoClient(
             MONGODB_CONFIG['host'], 
             MONGODB_CONFIG['port']
         )
-        self.mongo_db = self.mongo_client[MONGODB_CONFIG['database']]
-        self.mongo_collection = self.mongo_db[MONGODB_CONFIG['collection']]
         print("✓ MongoDB初始化完成")
+        return client
     
     def get_headers(self):
         """获取随机请求头"""
@@ -78,19 +192,36 @@ class NeteaseMusicCrawler:
             'Accept-Language': 'zh-CN,zh;q=0.9',
         }
     
+    def playlist_url(self, playlist_id):
+        """歌单详情接口地址"""
+        return f'https://music.163.com/api/playlist/detail?id={playlist_id}'
+    
+    def pause(self):
+        """未开启自适应限速时，每次请求之后随机等待"""
+        if self.rate is None:
+            delay = random.uniform(
+                CRAWL_CONFIG['delay_min'], 
+                CRAWL_CONFIG['delay_max']
+            )
+            time.sleep(delay)
+    
     def fetch_playlist(self, playlist_id, playlist_name):
         """获取歌单/排行榜歌曲"""
-        url = f'https://music.163.com/api/playlist/detail?id={playlist_id}'
+        url = self.playlist_url(playlist_id)
         
         try:
-            response = self.session.get(url, headers=self.get_headers(), timeout=15)
+            response = self.http.get(url)
             if response.status_code == 200:
-                data = response.json()
+                with self.metrics.timer('decode'):
+                    data = response.json()
                 if data.get('code') == 200:
                     tracks = data.get('result', {}).get('tracks', [])
                     return tracks
+                if self.http_cache:
+                    self.http_cache.discard(url)
             return []
         except Exception as e:
+            self.metrics.inc('request_failures')
             print(f"  请求失败: {e}")
             return []
     
@@ -117,73 +248,58 @@ class NeteaseMusicCrawler:
                 if duration > 1000:
                     duration = duration // 1000
                 
-                return {
-                    'song_id': song_id,
-                    'song_name': song_name,
-                    'artist_name': artist_name,
-                    'artist_id': artist_id,
-                    'album_name': album_name,
-                    'album_id': album_id,
-                    'duration': duration,
-                    'playlist_name': playlist_name,
-                    'playlist_id': playlist_id,
-                    'rank_num': rank,
-                }
+                return Song(
+                    song_id=song_id,
+                    song_name=song_name,
+                    artist_name=artist_name,
+                    artist_id=artist_id,
+                    album_name=album_name,
+                    album_id=album_id,
+                    duration=duration,
+                    playlist_name=playlist_name,
+                    playlist_id=playlist_id,
+                    rank_num=rank,
+                )
             return None
         except Exception as e:
             print(f"  解析失败: {e}")
             return None
     
     def save_to_mysql(self, song_data):
-        """保存到MySQL"""
-        try:
-            sql = """
-            INSERT IGNORE INTO songs 
-            (song_id, song_name, artist_name, artist_id, album_name, album_id, 
-             duration, playlist_name, playlist_id, rank_num)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            self.mysql_cursor.execute(sql, (
-                song_data['song_id'],
-                song_data['song_name'],
-                song_data['artist_name'],
-                song_data['artist_id'],
-                song_data['album_name'],
-                song_data['album_id'],
-                song_data['duration'],
-                song_data['playlist_name'],
-                song_data['playlist_id'],
-                song_data['rank_num'],
-            ))
-            self.mysql_conn.commit()
-            return True
-        except Exception as e:
-            print(f"  MySQL保存失败: {e}")
-            return False
+        """保存到MySQL（进入批量写入缓冲区）"""
+        return self.mysql_sink.add(song_data.to_row())
     
     def save_to_mongodb(self, song_data):
         """保存到MongoDB"""
+        document = song_data.to_document()
+        if self.mongo_sink:
+            return self.mongo_sink.add(document)
         try:
-            self.mongo_collection.update_one(
-                {'song_id': song_data['song_id']},
-                {'$set': song_data},
-                upsert=True
-            )
+            with self.metrics.timer('mongodb'):
+                self.mongo_collection.update_one(
+                    {'song_id': song_data.song_id},
+                    {'$set': document},
+                    upsert=True
+                )
+            self.metrics.inc('docs_written')
             return True
         except Exception as e:
             print(f"  MongoDB保存失败: {e}")
             return False
     
-    def crawl(self):
+    def crawl(self, resume=False):
         """执行爬取"""
         print("\n" + "="*50)
         print("网易云音乐排行榜爬虫")
         print("="*50)
         
-        total_count = 0
+        state = self.load_checkpoint(resume)
+        self.open_backup(append=bool(state), keep=state.get('backup_records'))
+        total_count = state.get('total', 0)
+        first = state.get('playlist_index', 0)
         max_songs = CRAWL_CONFIG['max_songs']
         
-        for playlist in PLAYLIST_IDS:
+        for index, playlist in enumerate(PLAYLIST_IDS[first:], first):
             if total_count >= max_songs:
                 break
             
@@ -192,60 +308,350 @@ class NeteaseMusicCrawler:
             print(f"\n正在爬取: {playlist_name} (ID: {playlist_id})")
             
             songs_data = self.fetch_playlist(playlist_id, playlist_name)
-            
+            total_count += self.store_playlist(
+                playlist_id, playlist_name, songs_data, max_songs - total_count
+            )
+            self.save_checkpoint(index + 1, total_count)
             if not songs_data:
-                print(f"  {playlist_name} 获取失败，跳过")
                 continue
             
-            playlist_count = 0
+            self.pause()
+        
+        return self.finish_crawl(total_count)
+    
+    def crawl_async(self, resume=False):
+        """并发爬取：多个歌单请求同时进行，解析和入库仍按歌单顺序执行"""
+        return asyncio.run(self._crawl_async(resume))
+    
+    async def _crawl_async(self, resume):
+        """并发获取歌单，按PLAYLIST_IDS顺序依次入库，入库在线程中执行"""
+        print("\n" + "="*50)
+        print("网易云音乐排行榜爬虫 (并发模式)")
+        print("="*50)
+        
+        state = self.load_checkpoint(resume)
+        self.open_backup(append=bool(state), keep=state.get('backup_records'))
+        total_count = state.get('total', 0)
+        first = state.get('playlist_index', 0)
+        max_songs = CRAWL_CONFIG['max_songs']
+        semaphore = asyncio.Semaphore(CRAWL_CONFIG.get('concurrency', 4))
+        throttle = HostThrottle(
+            CRAWL_CONFIG.get('host_concurrency', 2),
+            CRAWL_CONFIG.get('host_interval', 1.0),
+        )
+        
+        async def fetch(playlist):
+            host = urlparse(self.playlist_url(playlist['id'])).netloc
+            async with semaphore:
+                async with throttle.slot(host):
+                    return await asyncio.to_thread(
+                        self.fetch_playlist, playlist['id'], playlist['name']
+                    )
+        
+        # 只提前创建 concurrency 个抓取任务，达到 max_songs 后不再创建
+        playlists = enumerate(PLAYLIST_IDS[first:], first)
+        window = CRAWL_CONFIG.get('concurrency', 4)
+        pending = deque()
+        try:
+            while True:
+                while len(pending) < window and total_count < max_songs:
+                    item = next(playlists, None)
+                    if item is None:
+                        break
+                    index, playlist = item
+                    pending.append((index, playlist, asyncio.create_task(fetch(playlist))))
+                if not pending or total_count >= max_songs:
+                    break
+                
+                index, playlist, task = pending.popleft()
+                songs_data = await task
+                print(f"\n正在爬取: {playlist['name']} (ID: {playlist['id']})")
+                # 解析、写库和保存断点(会刷新各存储)都在线程中执行，不阻塞事件循环中的其他请求
+                total_count += await asyncio.to_thread(
+                    self.store_playlist, playlist['id'], playlist['name'], songs_data,
+                    max_songs - total_count
+                )
+                await asyncio.to_thread(self.save_checkpoint, index + 1, total_count)
+        finally:
+            tasks = [task for _, _, task in pending]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        return self.finish_crawl(total_count)
+    
+    def crawl_pipelined(self, resume=False):
+        """分阶段爬取：抓取、解析以及各存储分别在独立线程中进行"""
+        print("\n" + "="*50)
+        print("网易云音乐排行榜爬虫 (流水线模式)")
+        print("="*50)
+        
+        checkpoint_state = self.load_checkpoint(resume)
+        self.open_backup(
+            append=bool(checkpoint_state), keep=checkpoint_state.get('backup_records')
+        )
+        first = checkpoint_state.get('playlist_index', 0)
+        max_songs = CRAWL_CONFIG['max_songs']
+        state = {'total': checkpoint_state.get('total', 0)}
+        pipeline = CrawlPipeline(
+            queue_size=PIPELINE_CONFIG['queue_size'],
+            sink_queue_size=PIPELINE_CONFIG['sink_queue_size'],
+            report_interval=PIPELINE_CONFIG['report_interval'],
+        )
+        
+        def parse_stage(item):
+            index, playlist_id, playlist_name, songs_data = item
+            records = []
+            count = 0
+            limit = max_songs - state['total']
+            if not songs_data:
+                print(f"  {playlist_name} 获取失败，跳过")
+            else:
+                records = self.parse_playlist(
+                    playlist_id, playlist_name, songs_data, limit
+                )
+                count = len(records)
+                if self.is_unchanged(playlist_id):
+                    records = [pipeline.route(r, 'json') for r in records]
+                    print(f"  {playlist_name} 内容未变化，只写入备份 ({count} 首)")
+                else:
+                    print(f"  {playlist_name} 已解析 {count} 首歌曲")
+                self.mark_processed(playlist_id, songs_data, limit)
+            state['total'] += count
+            if state['total'] >= max_songs:
+                pipeline.stop_event.set()
+            if self.checkpoint.due():
+                # 各存储写完本歌单之前的数据后再记录断点
+                total = state['total']
+                cached = self.http_cache.take_pending() if self.http_cache else ()
+                seen = self.seen_index.take_pending() if self.seen_index else ()
+                
+                def on_stored(positions):
+                    self.checkpoint.save({
+                        'playlist_index': index + 1,
+                        'total': total,
+                        'backup_records': positions['json'],
+                    })
+                    if self.http_cache:
+                        self.http_cache.commit(cached)
+                    if self.seen_index:
+                        self.seen_index.commit(seen)
+                
+                records.append(pipeline.barrier(on_stored))
+            return records
+        
+        pipeline.set_parser(parse_stage)
+        pipeline.add_sink('mysql', self.save_to_mysql, flush=self.mysql_sink.flush)
+        pipeline.add_sink(
+            'mongodb', self.save_to_mongodb,
+            flush=self.mongo_sink.flush if self.mongo_sink else None,
+        )
+        pipeline.add_sink(
+            'json', self.save_to_backup,
+            flush=self.backup.flush, position=lambda: self.backup.count,
+        )
+        pipeline.start()
+        try:
+            for index, playlist in enumerate(PLAYLIST_IDS[first:], first):
+                if pipeline.stop_event.is_set():
+                    break
+                
+                playlist_id = playlist['id']
+                playlist_name = playlist['name']
+                print(f"\n正在爬取: {playlist_name} (ID: {playlist_id})")
+                
+                songs_data = pipeline.fetch(
+                    self.fetch_playlist, playlist_id, playlist_name
+                )
+                pipeline.submit((index, playlist_id, playlist_name, songs_data))
+                self.pause()
+        finally:
+            pipeline.close()
+        
+        pipeline.report()
+        return self.finish_crawl(state['total'])
+    
+    def parse_playlist(self, playlist_id, playlist_name, songs_data, limit):
+        """按排名顺序解析一个歌单，最多返回limit首"""
+        records = []
+        with self.metrics.timer('parse'):
             for rank, song in enumerate(songs_data, 1):
-                if total_count >= max_songs:
+                if len(records) >= limit:
                     break
+                if isinstance(song, dict) and self.is_known(song.get('id')):
+                    self.metrics.inc('duplicates_skipped')
+                    continue
                 
                 parsed = self.parse_song(song, playlist_id, playlist_name, rank)
-                if parsed and parsed['song_id']:
-                    self.save_to_mysql(parsed)
-                    self.save_to_mongodb(parsed)
-                    self.songs.append(parsed)
-                    total_count += 1
-                    playlist_count += 1
-            
-            print(f"  已爬取 {playlist_count} 首歌曲")
-            
-            delay = random.uniform(
-                CRAWL_CONFIG['delay_min'], 
-                CRAWL_CONFIG['delay_max']
-            )
-            time.sleep(delay)
+                if parsed and parsed.song_id:
+                    records.append(parsed)
+                    if self.seen_index:
+                        self.seen_index.add(parsed.song_id)
+        self.metrics.inc('records_parsed', len(records))
+        return records
+    
+    def is_unchanged(self, playlist_id):
+        """歌单内容与上次已入库的版本相同"""
+        return bool(self.http_cache) and self.http_cache.is_unchanged(
+            self.playlist_url(playlist_id)
+        )
+    
+    def mark_processed(self, playlist_id, songs_data, limit):
+        """歌单未被 limit 截断时记录该响应已入库，被截断的歌单下次仍完整写库"""
+        if self.http_cache and limit >= len(songs_data):
+            self.http_cache.mark_processed(self.playlist_url(playlist_id))
+    
+    def store_playlist(self, playlist_id, playlist_name, songs_data, limit):
+        """解析并保存一个歌单，最多保存limit首，返回保存数量"""
+        if not songs_data:
+            print(f"  {playlist_name} 获取失败，跳过")
+            return 0
+        
+        # 内容未变化时数据库中已有这些记录，只写入备份
+        unchanged = self.is_unchanged(playlist_id)
+        records = self.parse_playlist(playlist_id, playlist_name, songs_data, limit)
+        for parsed in records:
+            if not unchanged:
+                self.save_to_mysql(parsed)
+                self.save_to_mongodb(parsed)
+            self.save_to_backup(parsed)
+        self.mark_processed(playlist_id, songs_data, limit)
         
+        if unchanged:
+            print(f"  内容未变化，只写入备份 ({len(records)} 首)")
+        else:
+            print(f"  已爬取 {len(records)} 首歌曲")
+        return len(records)
+    
+    def load_checkpoint(self, resume):
+        """续爬时读取断点，否则清除旧断点重新开始"""
+        if not resume:
+            self.checkpoint.clear()
+            return {}
+        state = self.checkpoint.load()
+        if not state:
+            print("✓ 未找到断点，从头开始爬取")
+            return {}
+        print(f"✓ 从断点继续: 第 {state['playlist_index'] + 1} 个榜单，"
+              f"已获取 {state['total']} 首歌曲")
+        return state
+    
+    def save_checkpoint(self, playlist_index, total_count):
+        """到达保存间隔时先写出缓冲区再记录断点，保证断点之前的数据均已入库"""
+        if not self.checkpoint.due():
+            return
+        self.flush_sinks()
+        self.checkpoint.save({
+            'playlist_index': playlist_index,
+            'total': total_count,
+            'backup_records': self.backup.count,
+        })
+    
+    def is_known(self, item_id):
+        """该ID在之前的运行中已入库"""
+        if self.seen_index is None or item_id in (None, ''):
+            return False
+        if item_id in self.seen_index:
+            self.known_skipped += 1
+            return True
+        return False
+    
+    def flush_sinks(self):
+        """写出各存储缓冲区中的数据"""
+        self.mysql_sink.flush()
+        if self.mongo_sink:
+            self.mongo_sink.flush()
+        self.backup.flush()
+        if self.http_cache:
+            self.http_cache.commit()
+        if self.seen_index:
+            self.seen_index.commit()
+    
+    def finish_crawl(self, total_count):
+        """输出汇总并备份数据"""
+        self.flush_sinks()
+        self.checkpoint.clear()
         print(f"\n{'='*50}")
         print(f"爬取完成！共获取 {total_count} 首歌曲")
         print(f"数据已保存到 MySQL 和 MongoDB")
         print(f"{'='*50}")
+        self.mysql_sink.report()
+        if self.mongo_sink:
+            self.mongo_sink.report()
+        if self.http_cache:
+            self.http_cache.report()
+        if self.rate:
+            self.rate.report()
+        self.http.report()
+        if self.seen_index:
+            print(f"✓ 已入库ID索引共 {self.seen_index.count} 个，"
+                  f"本次跳过 {self.known_skipped} 条已入库记录")
+        self.metrics.print_summary()
+        if METRICS_CONFIG.get('report_path'):
+            self.metrics.save(METRICS_CONFIG['report_path'])
+            print(f"✓ 运行统计已保存到 {METRICS_CONFIG['report_path']}")
         
-        self.save_to_json()
+        print(f"✓ 数据已逐条备份到 {self.backup.path}")
+        if BACKUP_CONFIG['keep_in_memory']:
+            self.save_to_json()
         return total_count
     
+    def open_backup(self, append=False, keep=None):
+        """打开JSONL备份文件，续爬时追加写入，并去掉断点之后写入的 keep 条以后的记录"""
+        if self.backup:
+            self.backup.close()
+        self.backup = JsonlWriter(
+            BACKUP_CONFIG['path'],
+            compression=BACKUP_CONFIG.get('compression'),
+            flush_every=BACKUP_CONFIG.get('flush_every', 100),
+            append=append,
+            keep=keep,
+        )
+    
+    def save_to_backup(self, song_data):
+        """追加一条记录到JSONL备份，按配置同时保留在内存中"""
+        with self.metrics.timer('backup'):
+            self.backup.write(song_data.to_document())
+        if BACKUP_CONFIG['keep_in_memory']:
+            self.songs.append(song_data)
+    
     def save_to_json(self):
         """保存到JSON文件"""
         with open('data/songs.json', 'w', encoding='utf-8') as f:
-            json.dump(self.songs, f, ensure_ascii=False, indent=2)
+            json.dump([r.to_document() for r in self.songs], f, ensure_ascii=False, indent=2)
         print("✓ 数据已备份到 data/songs.json")
     
     def close(self):
         """关闭连接"""
-        self.mysql_cursor.close()
+        self.mysql_sink.close()
         self.mysql_conn.close()
+        if self.mongo_sink:
+            self.mongo_sink.close()
         self.mongo_client.close()
+        if self.backup:
+            self.backup.close()
+        if self.seen_index:
+            self.seen_index.close()
+        self.http.close()
+        self.metrics.close()
 
 
 if __name__ == '__main__':
     import os
+    parser = argparse.ArgumentParser(description='网易云音乐排行榜爬虫')
+    parser.add_argument('--resume', action='store_true', help='从上次中断的位置继续爬取')
+    args = parser.parse_args()
+    
     os.makedirs('data', exist_ok=True)
     os.makedirs('output', exist_ok=True)
     
     crawler = NeteaseMusicCrawler()
     try:
-        crawler.crawl()
+        if CRAWL_CONFIG.get('mode') == 'async':
+            crawler.crawl_async(resume=args.resume)
+        elif CRAWL_CONFIG.get('mode') == 'pipeline':
+            crawler.crawl_pipelined(resume=args.resume)
+        else:
+            crawler.crawl(resume=args.resume)
     finally:
         crawler.close()
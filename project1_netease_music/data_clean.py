@@ -2,50 +2,134 @@
 数据清洗和质量评估
 """
 import json
+import os
+from datetime import datetime, timedelta
 import pandas as pd
 import pymysql
-from config import MYSQL_CONFIG
+import pymysql.cursors
+from config import MYSQL_CONFIG, CLEAN_CONFIG, OUTPUT_CONFIG
+from checkpoint import CheckpointStore
+from columnar import ColumnarWriter, dataset_parts
+from seen_index import SeenIndex
+from quality import QualityProfile
+
+# 清洗和输出需要的字段及其类型，整数列可能为NULL，使用可空整数类型
+COLUMN_DTYPES = {
+    'song_id': 'Int64',
+    'song_name': 'object',
+    'artist_name': 'object',
+    'artist_id': 'Int64',
+    'album_name': 'object',
+    'album_id': 'Int64',
+    'duration': 'Int64',
+    'playlist_name': 'object',
+    'playlist_id': 'Int64',
+    'rank_num': 'Int64',
+}
+LOAD_COLUMNS = list(COLUMN_DTYPES)
+SELECT_SQL = f"SELECT {', '.join(LOAD_COLUMNS)} FROM songs"
+# 质量评估需要统计的内容
+PROFILE_OPTIONS = {
+    'id_column': 'song_id',
+    'unique_columns': ['artist_id', 'playlist_id'],
+}
 
 
 def load_data():
     """从MySQL加载数据"""
     conn = pymysql.connect(**MYSQL_CONFIG)
-    df = pd.read_sql("SELECT * FROM songs", conn)
+    df = pd.read_sql(SELECT_SQL, conn)
     conn.close()
-    return df
+    return df.astype(COLUMN_DTYPES)
+
+
+def load_data_chunks(chunk_size=None, since=None, with_created_at=False):
+    """
+    用服务端游标分块读取，逐块返回DataFrame
+    since 不为空时只读取该时间及之后入库的数据，with_created_at 为True时附带入库时间列
+    """
+    chunk_size = chunk_size or CLEAN_CONFIG['chunk_size']
+    columns = LOAD_COLUMNS + (['created_at'] if with_created_at else [])
+    sql = f"SELECT {', '.join(columns)} FROM songs"
+    params = None
+    if since is not None:
+        sql += " WHERE created_at >= %s"
+        params = (since,)
+    conn = pymysql.connect(**MYSQL_CONFIG)
+    cursor = conn.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute(sql + " ORDER BY id", params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=columns).astype(COLUMN_DTYPES)
+    finally:
+        cursor.close()
+        conn.close()
 
 
-def assess_quality(df):
-    """数据质量评估"""
+def print_quality_report(report):
+    """输出数据质量评估报告"""
     print("\n" + "="*50)
     print("数据质量评估报告")
     print("="*50)
     
-    total = len(df)
+    total = report['total']
     print(f"\n1. 数据总量: {total} 条")
     
     print("\n2. 缺失值分析:")
-    for col in df.columns:
-        null_count = df[col].isnull().sum()
-        empty_count = (df[col] == '').sum() if df[col].dtype == 'object' else 0
-        missing = null_count + empty_count
+    for col, missing in report['missing'].items():
         if missing > 0:
             print(f"   - {col}: {missing} ({missing/total*100:.2f}%)")
     
     print("\n3. 重复值分析:")
-    dup_songs = df['song_id'].duplicated().sum()
-    print(f"   - 重复歌曲ID: {dup_songs} 条")
+    print(f"   - 重复歌曲ID: {report['duplicates']} 条")
     
     print("\n4. 数据完整性:")
-    complete = df.dropna().shape[0]
+    complete = report['complete']
     print(f"   - 完整记录: {complete} ({complete/total*100:.2f}%)")
     
     print("\n5. 字段统计:")
-    print(f"   - 歌曲数量: {df['song_id'].nunique()}")
-    print(f"   - 歌手数量: {df['artist_id'].nunique()}")
-    print(f"   - 榜单数量: {df['playlist_id'].nunique()}")
+    print(f"   - 歌曲数量: {report['distinct']['song_id']}")
+    print(f"   - 歌手数量: {report['distinct']['artist_id']}")
+    print(f"   - 榜单数量: {report['distinct']['playlist_id']}")
     
-    return {'total': total, 'complete': complete, 'duplicates': dup_songs}
+    return {'total': total, 'complete': complete, 'duplicates': report['duplicates']}
+
+
+def assess_quality(data):
+    """数据质量评估，data 可以是DataFrame或逐块的DataFrame"""
+    return print_quality_report(QualityProfile.of(data, **PROFILE_OPTIONS).report())
+
+
+def clean_frame(df, seen_ids=None):
+    """
+    清洗一块数据，返回 (清洗后数据, 去重后行数)
+    seen_ids 为之前各块已保留的歌曲ID，分块清洗时用于跨块去重
+    """
+    df = df.drop_duplicates(subset=['song_id'], keep='first')
+    if seen_ids is not None:
+        # 只用本块的ID与集合求交集，isin 不必每块都转换整个集合
+        known = seen_ids.intersection(df['song_id'].dropna().unique().tolist())
+        if known:
+            df = df[~df['song_id'].isin(known)]
+        seen_ids.update(df['song_id'].dropna().unique().tolist())
+    deduped = len(df)
+    
+    df = df.copy(deep=False)  # 之后只整列替换，不修改原数组
+    df['song_name'] = df['song_name'].fillna('未知歌曲')
+    df['artist_name'] = df['artist_name'].fillna('未知歌手')
+    df['album_name'] = df['album_name'].fillna('未知专辑')
+    df['playlist_name'] = df['playlist_name'].astype('category')
+    
+    df['duration'] = pd.to_numeric(df['duration'], errors='coerce').fillna(0)
+    
+    df = df[df['duration'].between(0, 3600)]
+    df['duration'] = df['duration'].astype('int16')
+    
+    df['duration_min'] = (df['duration'] / 60).round(2)
+    return df, deduped
 
 
 def clean_data(df):
@@ -55,45 +139,230 @@ def clean_data(df):
     print("="*50)
     
     original_count = len(df)
-    
-    df = df.drop_duplicates(subset=['song_id'], keep='first')
-    print(f"1. 去重后: {len(df)} 条 (删除 {original_count - len(df)} 条)")
-    
-    df['song_name'] = df['song_name'].fillna('未知歌曲')
-    df['artist_name'] = df['artist_name'].fillna('未知歌手')
-    df['album_name'] = df['album_name'].fillna('未知专辑')
+    df, deduped = clean_frame(df)
+    print(f"1. 去重后: {deduped} 条 (删除 {original_count - deduped} 条)")
     print("2. 已填充缺失值")
-    
-    df['duration'] = pd.to_numeric(df['duration'], errors='coerce').fillna(0).astype(int)
     print("3. 已转换数据类型")
-    
-    df = df[df['duration'] >= 0]
-    df = df[df['duration'] <= 3600]
     print(f"4. 清理异常值后: {len(df)} 条")
-    
-    df['duration_min'] = (df['duration'] / 60).round(2)
     print("5. 已添加衍生字段")
     
     return df
 
 
+class CleanedWriter:
+    """
+    逐块写出清洗后的数据，输出与一次性保存的文件相同
+    append 为True时追加到已有的清洗结果之后
+    """
+    
+    def __init__(self, base_path=None, append=False):
+        base_path = base_path or OUTPUT_CONFIG['base_path']
+        os.makedirs(os.path.dirname(base_path) or '.', exist_ok=True)
+        self.paths = []
+        self.csv_file = self.json_file = self.columnar = None
+        self.json_has_rows = False
+        if OUTPUT_CONFIG.get('text', True):
+            csv_path, json_path = base_path + '.csv', base_path + '.json'
+            if append and os.path.exists(csv_path) and os.path.exists(json_path):
+                self.csv_file = open(csv_path, 'a', encoding='utf-8', newline='')
+                self.json_has_rows = self._reopen_json(json_path)
+                self.json_file = open(json_path, 'a', encoding='utf-8')
+            else:
+                self.csv_file = open(csv_path, 'w', encoding='utf-8-sig', newline='')
+                self.json_file = open(json_path, 'w', encoding='utf-8')
+                self.json_file.write('[')
+            self.paths += [csv_path, json_path]
+        fmt = OUTPUT_CONFIG.get('columnar')
+        if fmt:
+            self.columnar = ColumnarWriter(
+                f'{base_path}.{fmt}', fmt,
+                compression=OUTPUT_CONFIG['compression'],
+                row_group_size=OUTPUT_CONFIG['row_group_size'],
+                append=append,
+            )
+            self.paths.append(self.columnar.path)
+        self.count = 0
+    
+    @staticmethod
+    def _reopen_json(path):
+        """去掉已有JSON数组末尾的 "\n]"，返回其中是否已有记录"""
+        with open(path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            start = f.seek(max(size - 64, 0))
+            tail = f.read().rstrip()
+            if not tail.endswith(b']'):
+                raise ValueError(f"{path} 不是完整的JSON数组，无法追加")
+            end = start + len(tail[:-1].rstrip())
+            f.truncate(end)
+        return end > 1
+    
+    def write(self, df):
+        if df.empty:
+            return
+        if self.csv_file:
+            df.to_csv(self.csv_file, index=False, header=self.csv_file.tell() == 0)
+            # indent=2 的输出形如 "[\n  {...},\n  {...}\n]"，去掉首尾括号后拼接
+            body = df.to_json(orient='records', force_ascii=False, indent=2)[1:-1].strip('\n')
+            self.json_file.write((',\n' if self.json_has_rows else '\n') + body)
+            self.json_has_rows = True
+        if self.columnar:
+            self.columnar.write(df)
+        self.count += len(df)
+    
+    def close(self):
+        if self.csv_file:
+            self.json_file.write('\n]' if self.json_has_rows else ']')
+            self.csv_file.close()
+            self.json_file.close()
+        if self.columnar:
+            self.columnar.close()
+
+
 def save_cleaned_data(df):
     """保存清洗后的数据"""
-    import os
-    os.makedirs('data', exist_ok=True)
-    df.to_csv('data/songs_cleaned.csv', index=False, encoding='utf-8-sig')
-    print("\n✓ 清洗后数据已保存到 data/songs_cleaned.csv")
+    writer = CleanedWriter()
+    writer.write(df)
+    writer.close()
+    print()
+    for path in writer.paths:
+        print(f"✓ 清洗后数据已保存到 {path}")
+
+
+def cleaned_output_exists():
+    """是否已有可追加的清洗结果；旧版本输出的单个列式文件不能追加分片，视为没有"""
+    base_path = OUTPUT_CONFIG['base_path']
+    fmt = OUTPUT_CONFIG.get('columnar')
+    if fmt:
+        return bool(dataset_parts(f'{base_path}.{fmt}'))
+    return OUTPUT_CONFIG.get('text', True) and os.path.exists(base_path + '.csv')
+
+
+class CleanedIds:
+    """
+    已清洗的歌曲ID，提供 clean_frame 用到的 intersection / update
+    之前各次运行的ID保存在 SeenIndex 中，只查询本块出现的ID，不必每次读入全部清洗结果
+    本次运行的ID在 commit 时才写入索引，清洗失败时不会登记未输出的ID
+    """
+    
+    def __init__(self, path):
+        self.index = SeenIndex(path)
+        self.current = set()
+    
+    def __len__(self):
+        return self.index.count
+    
+    def intersection(self, ids):
+        return {i for i in ids if i in self.current or i in self.index}
+    
+    def update(self, ids):
+        for i in ids:
+            self.current.add(i)
+            self.index.add(i)
+    
+    def commit(self):
+        self.index.commit()
+    
+    def close(self):
+        self.index.take_pending()
+        self.index.close()
+
+
+def clean_in_chunks(since=None, seen_ids=None, append=False):
+    """
+    分块评估和清洗，峰值内存只与块大小和歌曲ID数量有关
+    增量清洗时 since 为读取起点，seen_ids 为已有清洗结果中的ID，新数据追加到已有结果之后
+    返回读到的最大入库时间，没有数据时返回None
+    """
+    profile = QualityProfile(**PROFILE_OPTIONS)
+    seen_ids = set() if seen_ids is None else seen_ids
+    original_count = deduped = 0
+    watermark = None
+    # 追加时等有新数据才打开，避免没有新数据也重写列式文件
+    writer = None if append else CleanedWriter()
+    try:
+        for chunk in load_data_chunks(since=since, with_created_at=True):
+            created_at = chunk.pop('created_at').max()
+            if pd.notna(created_at) and (watermark is None or created_at > watermark):
+                watermark = created_at
+            profile.update(chunk)
+            original_count += len(chunk)
+            cleaned, chunk_deduped = clean_frame(chunk, seen_ids)
+            deduped += chunk_deduped
+            if writer is None and not cleaned.empty:
+                writer = CleanedWriter(append=True)
+            if writer:
+                writer.write(cleaned)
+    finally:
+        if writer:
+            writer.close()
+    
+    if profile.total == 0:
+        print("没有新入库的数据" if append else "没有可清洗的数据")
+        return watermark
+    print_quality_report(profile.report())
+    
+    print("\n" + "="*50)
+    print("数据清洗")
+    print("="*50)
+    print(f"1. 去重后: {deduped} 条 (删除 {original_count - deduped} 条)")
+    print("2. 已填充缺失值")
+    print("3. 已转换数据类型")
+    print(f"4. 清理异常值后: {writer.count if writer else 0} 条")
+    print("5. 已添加衍生字段")
+    print()
+    if writer is None:
+        print("✓ 没有需要合并的新数据，清洗结果未改变")
+    elif append:
+        for path in writer.paths:
+            print(f"✓ 新数据已合并到 {path}")
+    else:
+        for path in writer.paths:
+            print(f"✓ 清洗后数据已保存到 {path}")
+    return watermark
+
+
+def clean_incremental():
+    """增量清洗：只读取上次水位之后入库的数据，按歌曲ID去重后合并到已有清洗结果"""
+    state_store = CheckpointStore(CLEAN_CONFIG['state_path'])
+    state = state_store.load()
+    ids_path = CLEAN_CONFIG['ids_path']
+    if state and not (os.path.exists(ids_path) and cleaned_output_exists()):
+        print("未找到已有清洗结果，重新全量清洗")
+        state = None
+    if not state:
+        for path in (ids_path, ids_path + '.bloom'):
+            if os.path.exists(path):
+                os.remove(path)
+    seen_ids = CleanedIds(ids_path)
+    
+    since = None
+    if state:
+        # 往前多读一段时间，防止漏掉入库时间早于水位但提交较晚的记录，重复的记录会按ID去掉
+        since = datetime.fromisoformat(state['watermark']) - timedelta(seconds=CLEAN_CONFIG['watermark_overlap'])
+        print(f"增量清洗: 读取 {since} 之后入库的数据，已有清洗结果 {len(seen_ids)} 条")
     
-    df.to_json('data/songs_cleaned.json', orient='records', force_ascii=False, indent=2)
-    print("✓ 清洗后数据已保存到 data/songs_cleaned.json")
+    try:
+        watermark = clean_in_chunks(since=since, seen_ids=seen_ids, append=bool(state))
+        if watermark is not None:
+            # 清洗结果写完后再登记ID和水位
+            seen_ids.commit()
+            state_store.save({'watermark': str(watermark)})
+            print(f"✓ 清洗水位已更新为 {watermark}")
+    finally:
+        seen_ids.close()
 
 
 def main():
     print("开始数据清洗和质量评估...")
-    df = load_data()
-    assess_quality(df)
-    df_cleaned = clean_data(df)
-    save_cleaned_data(df_cleaned)
+    if CLEAN_CONFIG.get('incremental'):
+        clean_incremental()
+    elif CLEAN_CONFIG.get('chunked'):
+        clean_in_chunks()
+    else:
+        df = load_data()
+        assess_quality(df)
+        df_cleaned = clean_data(df)
+        save_cleaned_data(df_cleaned)
     print("\n" + "="*50)
     print("数据清洗完成！")
     print("="*50)
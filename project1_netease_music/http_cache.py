@@ -0,0 +1,159 @@
+"""
+HTTP响应缓存
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+
+class CachedResponse:
+    """从缓存返回的响应，用法与 requests.Response 一致"""
+
+    def __init__(self, content):
+        self.status_code = 200
+        self.content = content
+        self.from_cache = True
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class ResponseCache:
+    """按URL和参数在本地缓存响应体
+
+    未过期时直接返回缓存；过期后带 ETag/Last-Modified 发送条件请求，
+    服务器返回304时继续使用缓存。内容与上次已入库的版本相同的请求
+    会记入 unchanged，爬虫据此跳过写库。
+    """
+
+    def __init__(self, cache_dir, ttl=3600):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.unchanged = set()
+        self.pending = set()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, url, params=None):
+        query = urlencode(sorted((params or {}).items()))
+        return hashlib.sha1(f'{url}?{query}'.encode('utf-8')).hexdigest()
+
+    def _meta_path(self, key):
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, key + '.body')
+
+    def _load(self, key):
+        try:
+            with open(self._meta_path(key), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(self._body_path(key), 'rb') as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def is_fresh(self, url, params=None):
+        """缓存未过期，get 会直接返回缓存而不发出请求"""
+        try:
+            with open(self._meta_path(self.key(url, params)), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return time.time() - meta['fetched_at'] < self.ttl
+
+    def _save_meta(self, key, meta):
+        with open(self._meta_path(key), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    def _reuse(self, key, meta, body, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            self.bytes_saved += len(body)
+            if meta.get('processed'):
+                self.unchanged.add(key)
+        return CachedResponse(body)
+
+    def get(self, session, url, params=None, headers=None, **kwargs):
+        """代替 session.get，参数相同"""
+        key = self.key(url, params)
+        meta, body = self._load(key)
+        if meta and time.time() - meta['fetched_at'] < self.ttl:
+            return self._reuse(key, meta, body, 'hits')
+
+        headers = dict(headers or {})
+        if meta and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        response = session.get(url, params=params, headers=headers, **kwargs)
+
+        if response.status_code == 304 and meta:
+            meta['fetched_at'] = time.time()
+            self._save_meta(key, meta)
+            return self._reuse(key, meta, body, 'revalidated')
+
+        with self._lock:
+            self.misses += 1
+        if response.status_code == 200:
+            digest = hashlib.sha1(response.content).hexdigest()
+            processed = bool(meta and meta.get('processed') and meta['digest'] == digest)
+            if processed:
+                with self._lock:
+                    self.unchanged.add(key)
+            with open(self._body_path(key), 'wb') as f:
+                f.write(response.content)
+            self._save_meta(key, {
+                'url': url,
+                'fetched_at': time.time(),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'digest': digest,
+                'processed': processed,
+            })
+        return response
+
+    def is_unchanged(self, url, params=None):
+        """本次获取的内容是否与上次已入库的版本相同"""
+        return self.key(url, params) in self.unchanged
+
+    def discard(self, url, params=None):
+        """删除无效内容的缓存，例如接口返回了错误码"""
+        key = self.key(url, params)
+        for path in (self._meta_path(key), self._body_path(key)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def mark_processed(self, url, params=None):
+        """记录该响应已解析，待数据写入数据库后由 commit 持久化"""
+        with self._lock:
+            self.pending.add(self.key(url, params))
+
+    def take_pending(self):
+        with self._lock:
+            keys, self.pending = self.pending, set()
+        return keys
+
+    def commit(self, keys=None):
+        """把已入库响应的 processed 标记写入缓存元数据"""
+        if keys is None:
+            keys = self.take_pending()
+        for key in keys:
+            meta, _ = self._load(key)
+            if meta and not meta.get('processed'):
+                meta['processed'] = True
+                self._save_meta(key, meta)
+
+    def report(self):
+        total = self.hits + self.revalidated + self.misses
+        print(f"✓ 响应缓存: 请求 {total} 次，命中 {self.hits}，"
+              f"304重新验证 {self.revalidated}，未命中 {self.misses}，"
+              f"内容未变化 {len(self.unchanged)}，"
+              f"节省下载 {self.bytes_saved / 1024:.1f} KB")
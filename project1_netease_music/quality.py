@@ -0,0 +1,122 @@
+"""
+增量数据质量统计
+对整表或逐块数据一次扫描得到缺失、重复、基数和取值范围，分块结果可以合并
+"""
+import pandas as pd
+
+
+class QualityProfile:
+    """
+    可合并的数据质量统计
+
+    id_column: 判断重复记录的字段
+    unique_columns: 需要统计不同取值个数的字段(id_column 会自动包含)
+    range_columns: 需要统计最小/最大值的字段
+    complete_columns: 判断记录是否完整的字段，默认为全部字段
+    """
+
+    # 每个字段累积的去重块数超过该值时合并一次，控制内存
+    COMPACT_EVERY = 16
+
+    def __init__(self, id_column, unique_columns=(), range_columns=(), complete_columns=None):
+        self.id_column = id_column
+        self.unique_columns = [id_column] + [c for c in unique_columns if c != id_column]
+        self.range_columns = list(range_columns)
+        self.complete_columns = list(complete_columns) if complete_columns else None
+        self.total = 0
+        self.complete = 0
+        self.missing = {}
+        self.uniques = {col: [] for col in self.unique_columns}
+        self.ranges = {col: (None, None) for col in self.range_columns}
+
+    @classmethod
+    def of(cls, data, **kwargs):
+        """统计一个DataFrame或由DataFrame组成的可迭代对象"""
+        profile = cls(**kwargs)
+        if isinstance(data, pd.DataFrame):
+            return profile.update(data)
+        for chunk in data:
+            profile.update(chunk)
+        return profile
+
+    def update(self, df):
+        """累加一块数据"""
+        if df.empty:
+            return self
+        self.total += len(df)
+
+        # 一次得到全部字段的空值掩码，文本字段另外统计空字符串(与空值互斥)
+        null_mask = df.isna()
+        text_columns = [col for col in df.columns if df[col].dtype == 'object']
+        empty = df[text_columns].eq('').sum() if text_columns else {}
+        for col, count in null_mask.sum().items():
+            self.missing[col] = self.missing.get(col, 0) + int(count) + int(empty.get(col, 0))
+
+        complete_mask = null_mask if self.complete_columns is None else null_mask[self.complete_columns]
+        self.complete += int((~complete_mask.to_numpy().any(axis=1)).sum())
+
+        for col in self.unique_columns:
+            self._add_uniques(col, pd.unique(df[col]))
+
+        for col in self.range_columns:
+            values = df[col]
+            low, high = values.min(), values.max()
+            if pd.isna(low):
+                continue
+            self.ranges[col] = self._widen(self.ranges[col], low, high)
+        return self
+
+    def merge(self, other):
+        """合并另一份统计结果"""
+        self.total += other.total
+        self.complete += other.complete
+        for col, count in other.missing.items():
+            self.missing[col] = self.missing.get(col, 0) + count
+        for col in self.unique_columns:
+            for values in other.uniques.get(col, ()):
+                self._add_uniques(col, values)
+        for col in self.range_columns:
+            low, high = other.ranges.get(col, (None, None))
+            if low is not None:
+                self.ranges[col] = self._widen(self.ranges[col], low, high)
+        return self
+
+    def _add_uniques(self, col, values):
+        parts = self.uniques[col]
+        parts.append(values)
+        if len(parts) >= self.COMPACT_EVERY:
+            self.uniques[col] = [self._distinct(parts)]
+
+    @staticmethod
+    def _distinct(parts):
+        if len(parts) == 1:
+            return parts[0]
+        return pd.unique(pd.concat([pd.Series(p) for p in parts], ignore_index=True))
+
+    @staticmethod
+    def _widen(current, low, high):
+        cur_low, cur_high = current
+        if cur_low is None:
+            return low, high
+        return min(cur_low, low), max(cur_high, high)
+
+    def report(self):
+        """汇总为报告字典"""
+        distinct = {}
+        has_null = {}
+        for col, parts in self.uniques.items():
+            values = self._distinct(parts) if parts else []
+            self.uniques[col] = [values] if parts else []
+            nulls = int(pd.Series(values).isna().any()) if len(values) else 0
+            distinct[col] = len(values) - nulls
+            has_null[col] = nulls
+        # 与 Series.duplicated() 一致：空值也参与判重
+        id_distinct = distinct[self.id_column] + has_null[self.id_column]
+        return {
+            'total': self.total,
+            'missing': {col: count for col, count in self.missing.items()},
+            'complete': self.complete,
+            'duplicates': self.total - id_distinct,
+            'distinct': distinct,
+            'ranges': dict(self.ranges),
+        }
@@ -0,0 +1,40 @@
+"""
+解析后的记录类型
+"""
+
+
+class Song:
+    """歌曲记录，使用 __slots__ 省去每条记录的 __dict__"""
+
+    __slots__ = (
+        'song_id', 'song_name', 'artist_name', 'artist_id', 'album_name',
+        'album_id', 'duration', 'playlist_name', 'playlist_id', 'rank_num',
+    )
+
+    def __init__(self, song_id, song_name, artist_name, artist_id, album_name,
+                 album_id, duration, playlist_name, playlist_id, rank_num):
+        self.song_id = song_id
+        self.song_name = song_name
+        self.artist_name = artist_name
+        self.artist_id = artist_id
+        self.album_name = album_name
+        self.album_id = album_id
+        self.duration = duration
+        self.playlist_name = playlist_name
+        self.playlist_id = playlist_id
+        self.rank_num = rank_num
+
+    def to_row(self):
+        """MySQL插入参数，字段顺序与 __slots__ 及 songs 表插入语句一致"""
+        return (
+            self.song_id, self.song_name, self.artist_name, self.artist_id,
+            self.album_name, self.album_id, self.duration, self.playlist_name,
+            self.playlist_id, self.rank_num,
+        )
+
+    def to_document(self):
+        """MongoDB文档 / JSON备份使用的字典"""
+        return dict(zip(self.__slots__, self.to_row()))
+
+    def __repr__(self):
+        return f'Song({self.song_id}, {self.song_name!r})'
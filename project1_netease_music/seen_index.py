@@ -0,0 +1,113 @@
+"""
+跨运行的已入库ID索引
+"""
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+
+
+class BloomFilter:
+    """位图布隆过滤器，按容量和误判率计算位数和哈希次数"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class SeenIndex:
+    """已入库ID索引：布隆过滤器在内存中快速排除新ID，SQLite 做精确判断
+
+    新登记的ID先放在 pending 中，数据写入数据库后再由 commit 持久化，
+    避免崩溃时把未入库的记录标记为已入库。
+    只有之前的运行中登记的ID才算已入库；本次运行登记的ID(例如在多个榜单中
+    重复出现的歌曲)照常处理，计数和写库与不开启索引时一致。
+    """
+
+    def __init__(self, path, capacity=1000000, error_rate=0.01):
+        self.path = path
+        self.bloom_path = path + '.bloom'
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.pending = set()
+        self.added = set()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY) WITHOUT ROWID')
+        self.count = self.db.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+        self.bloom = self._load_bloom()
+
+    def _load_bloom(self):
+        """读取保存的位图；位图缺失或与数据库不一致时从数据库重建"""
+        bloom = BloomFilter(max(self.capacity, self.count), self.error_rate)
+        try:
+            with open(self.bloom_path, 'rb') as f:
+                header = f.readline().split()
+                if [int(v) for v in header] == [bloom.size, bloom.hashes, self.count]:
+                    bloom.bits = bytearray(f.read())
+                    return bloom
+        except (OSError, ValueError):
+            pass
+        for (item_id,) in self.db.execute('SELECT id FROM seen'):
+            bloom.add(item_id)
+        return bloom
+
+    def _save_bloom(self):
+        tmp_path = self.bloom_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(f'{self.bloom.size} {self.bloom.hashes} {self.count}\n'.encode())
+            f.write(self.bloom.bits)
+        os.replace(tmp_path, self.bloom_path)
+
+    def __contains__(self, item_id):
+        item_id = str(item_id)
+        with self._lock:
+            if item_id not in self.bloom or item_id in self.added:
+                return False
+            row = self.db.execute('SELECT 1 FROM seen WHERE id = ?', (item_id,)).fetchone()
+            return row is not None
+
+    def add(self, item_id):
+        item_id = str(item_id)
+        with self._lock:
+            self.bloom.add(item_id)
+            self.pending.add(item_id)
+            self.added.add(item_id)
+
+    def take_pending(self):
+        with self._lock:
+            ids, self.pending = self.pending, set()
+        return ids
+
+    def commit(self, ids=None):
+        """把已入库的ID写入索引；默认提交全部待提交ID"""
+        if ids is None:
+            ids = self.take_pending()
+        if not ids:
+            return
+        with self._lock:
+            cursor = self.db.executemany('INSERT OR IGNORE INTO seen (id) VALUES (?)',
+                                         ((i,) for i in ids))
+            self.db.commit()
+            self.count += cursor.rowcount
+
+    def close(self):
+        self.commit()
+        self._save_bloom()
+        self.db.close()
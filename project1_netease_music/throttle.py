@@ -0,0 +1,96 @@
+"""
+请求节流控制
+"""
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+
+
+class HostThrottle:
+    """按主机限制并发数和相邻请求间隔（asyncio）"""
+
+    def __init__(self, max_per_host=2, min_interval=1.0):
+        self.max_per_host = max_per_host
+        self.min_interval = min_interval
+        self._semaphores = {}
+        self._next_time = {}
+
+    @asynccontextmanager
+    async def slot(self, host):
+        """占用一个主机请求名额，必要时等待到允许的发送时间"""
+        semaphore = self._semaphores.setdefault(
+            host, asyncio.Semaphore(self.max_per_host)
+        )
+        async with semaphore:
+            now = time.monotonic()
+            start = max(now, self._next_time.get(host, now))
+            self._next_time[host] = start + self.min_interval
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+
+
+class AdaptiveRate:
+    """AIMD 自适应请求速率，多个线程共用
+
+    响应正常时每次把速率加 increase 次/秒，直到 ceiling；
+    遇到 403/429/5xx、请求异常或响应慢于 slow_latency 时速率乘以 decrease，
+    不低于 floor。同一时间间隔内连续的多个失败只降速一次。
+    """
+
+    def __init__(self, floor=0.2, ceiling=1.0, increase=0.05, decrease=0.5, slow_latency=5.0):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self.rate = floor
+        self.min_rate = floor
+        self.max_rate = floor
+        self.backoffs = 0
+        self._next_time = time.monotonic()
+        self._backoff_at = None
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """占用下一个发送时间，必要时阻塞等待"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + 1 / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+    @staticmethod
+    def is_throttled(status):
+        return status is None or status in (403, 429) or status >= 500
+
+    def record(self, status, latency, retry_after=None):
+        """根据一次请求的状态码(异常为None)和耗时调整速率"""
+        with self._lock:
+            now = time.monotonic()
+            if self.is_throttled(status) or latency > self.slow_latency:
+                if self._backoff_at is None or now - self._backoff_at >= 1 / self.rate:
+                    self.rate = max(self.floor, self.rate * self.decrease)
+                    self.min_rate = min(self.min_rate, self.rate)
+                    self.backoffs += 1
+                    self._backoff_at = now
+                pause = max(1 / self.rate, retry_after or 0)
+                self._next_time = max(self._next_time, now + pause)
+            elif status == 200:
+                self.rate = min(self.ceiling, self.rate + self.increase)
+                self.max_rate = max(self.max_rate, self.rate)
+
+    def report(self):
+        print(f"✓ 自适应限速: 当前 {self.rate:.2f} 次/秒，最高 {self.max_rate:.2f}，"
+              f"最低 {self.min_rate:.2f}，降速 {self.backoffs} 次")
+
+
+def retry_after_seconds(response):
+    """读取 Retry-After 响应头中的秒数，没有或为日期格式时返回None"""
+    value = getattr(response, 'headers', {}).get('Retry-After')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
@@ -1,12 +1,18 @@
 """
 数据可视化分析
 """
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib
 from collections import Counter
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import warnings
+from config import OUTPUT_CONFIG, VISUALIZE_CONFIG
+from columnar import dataset_parts, read_columnar
+from chart_cache import ChartCache
 warnings.filterwarnings('ignore')
 
 matplotlib.rcParams['font.sans-serif'] = ['Heiti SC', 'STHeiti', 'PingFang SC', 'Hiragino Sans GB', 'Arial Unicode MS']
@@ -14,15 +20,61 @@ matplotlib.rcParams['font.family'] = 'sans-serif'
 matplotlib.rcParams['axes.unicode_minus'] = False
 
 OUTPUT_DIR = 'output'
+# 各图表和统计用到的字段，只加载这些列
+CHART_COLUMNS = {
+    'stats': ['song_id', 'artist_id', 'playlist_id', 'duration_min'],
+    'playlist_distribution': ['playlist_name'],
+    'duration_distribution': ['duration_min'],
+    'top_artists': ['artist_name'],
+    'duration_by_playlist': ['playlist_name', 'duration_min'],
+    'playlist_pie': ['playlist_name'],
+}
+# 各图表用到的汇总结果，见 build_aggregates
+CHART_AGGREGATES = {
+    'playlist_distribution': ['playlist_counts'],
+    'duration_distribution': ['duration_hist', 'duration_stats'],
+    'top_artists': ['artist_counts'],
+    'duration_by_playlist': ['avg_duration_by_playlist'],
+    'playlist_pie': ['playlist_counts'],
+}
+TOP_N = 15
+
+
+def load_data(columns=None):
+    """读取清洗后的数据，有列式数据集时只读取所需字段"""
+    base_path = OUTPUT_CONFIG['base_path']
+    fmt = OUTPUT_CONFIG.get('columnar')
+    if fmt and dataset_parts(f'{base_path}.{fmt}'):
+        return read_columnar(f'{base_path}.{fmt}', columns)
+    return pd.read_csv(f'{base_path}.csv', usecols=columns)
+
+
+def build_aggregates(df):
+    """一次算出所有图表和统计摘要需要的汇总结果，绘图时不再访问明细数据"""
+    durations = df['duration_min'].dropna()
+    hist_counts, hist_edges = np.histogram(durations, bins=30)
+    return {
+        'playlist_counts': df['playlist_name'].value_counts(),
+        'duration_hist': (hist_counts, hist_edges),
+        'duration_stats': {'mean': durations.mean(), 'median': durations.median()},
+        'artist_counts': df['artist_name'].value_counts().head(TOP_N),
+        'avg_duration_by_playlist': df.groupby('playlist_name', observed=True)['duration_min']
+                                      .mean().sort_values(ascending=False),
+        'summary': {
+            '总歌曲数': len(df),
+            '唯一歌曲数': df['song_id'].nunique(),
+            '歌手数量': df['artist_id'].nunique(),
+            '榜单数量': df['playlist_id'].nunique(),
+            '平均时长(分钟)': round(durations.mean(), 2),
+            '最长歌曲时长(分钟)': round(durations.max(), 2),
+            '最短歌曲时长(分钟)': round(durations.min(), 2),
+        },
+    }
 
 
-def load_data():
-    return pd.read_csv('data/songs_cleaned.csv')
-
-
-def plot_playlist_distribution(df):
+def plot_playlist_distribution(agg):
     plt.figure(figsize=(12, 6))
-    playlist_counts = df['playlist_name'].value_counts()
+    playlist_counts = agg['playlist_counts']
     colors = plt.cm.Set3(range(len(playlist_counts)))
     bars = plt.bar(range(len(playlist_counts)), playlist_counts.values, color=colors)
     plt.xticks(range(len(playlist_counts)), playlist_counts.index, rotation=45, ha='right')
@@ -38,12 +90,13 @@ def plot_playlist_distribution(df):
     print(f"✓ 已生成 {OUTPUT_DIR}/playlist_distribution.png")
 
 
-def plot_duration_distribution(df):
+def plot_duration_distribution(agg):
     plt.figure(figsize=(10, 6))
-    durations = df['duration_min'].dropna()
-    plt.hist(durations, bins=30, color='steelblue', edgecolor='white', alpha=0.7)
-    plt.axvline(durations.mean(), color='red', linestyle='--', label=f'平均: {durations.mean():.2f}分钟')
-    plt.axvline(durations.median(), color='orange', linestyle='--', label=f'中位数: {durations.median():.2f}分钟')
+    counts, edges = agg['duration_hist']
+    stats = agg['duration_stats']
+    plt.hist(edges[:-1], bins=edges, weights=counts, color='steelblue', edgecolor='white', alpha=0.7)
+    plt.axvline(stats['mean'], color='red', linestyle='--', label=f"平均: {stats['mean']:.2f}分钟")
+    plt.axvline(stats['median'], color='orange', linestyle='--', label=f"中位数: {stats['median']:.2f}分钟")
     plt.xlabel('时长 (分钟)')
     plt.ylabel('歌曲数量')
     plt.title('歌曲时长分布')
@@ -54,9 +107,9 @@ def plot_duration_distribution(df):
     print(f"✓ 已生成 {OUTPUT_DIR}/duration_distribution.png")
 
 
-def plot_top_artists(df, top_n=15):
+def plot_top_artists(agg, top_n=TOP_N):
     plt.figure(figsize=(12, 8))
-    artist_counts = df['artist_name'].value_counts().head(top_n)
+    artist_counts = agg['artist_counts'].head(top_n)
     colors = plt.cm.Blues(range(50, 250, int(200/top_n)))[::-1]
     bars = plt.barh(range(len(artist_counts)), artist_counts.values, color=colors)
     plt.yticks(range(len(artist_counts)), artist_counts.index)
@@ -73,9 +126,9 @@ def plot_top_artists(df, top_n=15):
     print(f"✓ 已生成 {OUTPUT_DIR}/top_artists.png")
 
 
-def plot_duration_by_playlist(df):
+def plot_duration_by_playlist(agg):
     plt.figure(figsize=(12, 6))
-    avg_duration = df.groupby('playlist_name')['duration_min'].mean().sort_values(ascending=False)
+    avg_duration = agg['avg_duration_by_playlist']
     colors = plt.cm.Pastel1(range(len(avg_duration)))
     bars = plt.bar(range(len(avg_duration)), avg_duration.values, color=colors)
     plt.xticks(range(len(avg_duration)), avg_duration.index, rotation=45, ha='right')
@@ -91,9 +144,9 @@ def plot_duration_by_playlist(df):
     print(f"✓ 已生成 {OUTPUT_DIR}/duration_by_playlist.png")
 
 
-def plot_pie_chart(df):
+def plot_pie_chart(agg):
     plt.figure(figsize=(10, 10))
-    playlist_counts = df['playlist_name'].value_counts()
+    playlist_counts = agg['playlist_counts']
     colors = plt.cm.Set3(range(len(playlist_counts)))
     explode = [0.02] * len(playlist_counts)
     plt.pie(playlist_counts.values, labels=playlist_counts.index, autopct='%1.1f%%',
@@ -105,16 +158,8 @@ def plot_pie_chart(df):
     print(f"✓ 已生成 {OUTPUT_DIR}/playlist_pie.png")
 
 
-def generate_stats_summary(df):
-    summary = {
-        '总歌曲数': len(df),
-        '唯一歌曲数': df['song_id'].nunique(),
-        '歌手数量': df['artist_id'].nunique(),
-        '榜单数量': df['playlist_id'].nunique(),
-        '平均时长(分钟)': round(df['duration_min'].mean(), 2),
-        '最长歌曲时长(分钟)': round(df['duration_min'].max(), 2),
-        '最短歌曲时长(分钟)': round(df['duration_min'].min(), 2),
-    }
+def generate_stats_summary(agg):
+    summary = agg['summary']
     print("\n" + "="*50)
     print("数据统计摘要")
     print("="*50)
@@ -123,17 +168,73 @@ def generate_stats_summary(df):
     return summary
 
 
+# 图表名称与绘图函数，名称与 CHART_AGGREGATES 对应
+CHARTS = {
+    'playlist_distribution': plot_playlist_distribution,
+    'duration_distribution': plot_duration_distribution,
+    'top_artists': plot_top_artists,
+    'duration_by_playlist': plot_duration_by_playlist,
+    'playlist_pie': plot_pie_chart,
+}
+
+# 子进程中共享的汇总结果，由 _init_worker 设置
+_worker_agg = None
+
+
+def _init_worker(agg):
+    """子进程初始化：只接收一次汇总结果，之后各任务只传图表名称"""
+    global _worker_agg
+    plt.switch_backend('Agg')
+    _worker_agg = agg
+
+
+def _render_chart(name):
+    CHARTS[name](_worker_agg)
+    return name
+
+
+def render_charts(agg):
+    """按 VISUALIZE_CONFIG['workers'] 用多个进程并行生成图表，开启缓存时跳过没有变化的图表"""
+    started = time.perf_counter()
+    names = list(CHARTS)
+    cache = ChartCache(OUTPUT_DIR) if VISUALIZE_CONFIG.get('cache') else None
+    keys = {}
+    if cache:
+        params = {'matplotlib': matplotlib.__version__, 'rc': matplotlib.rcParams['font.sans-serif']}
+        keys = {name: cache.key(CHARTS[name], {key: agg[key] for key in CHART_AGGREGATES[name]}, params)
+                for name in names}
+        names = [name for name in names if not cache.is_fresh(name, keys[name])]
+
+    # 进程数不超过CPU核数，单核时直接逐个生成
+    workers = min(VISUALIZE_CONFIG.get('workers', 1), len(names), os.cpu_count() or 1)
+    if workers <= 1:
+        for name in names:
+            CHARTS[name](agg)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(agg,)) as pool:
+            list(pool.map(_render_chart, names))
+    if names:
+        used = f"{max(workers, 1)} 个进程，生成 {len(names)} 张"
+    else:
+        used = "0 个进程，全部复用"
+    print(f"图表生成耗时 {time.perf_counter() - started:.1f} 秒 ({used})")
+
+    if cache:
+        for name in names:
+            cache.record(name, keys[name])
+        cache.save()
+        cache.report()
+
+
 def main():
     print("开始生成可视化图表...")
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    df = load_data()
-    generate_stats_summary(df)
+    df = load_data(sorted(set().union(*CHART_COLUMNS.values())))
+    agg = build_aggregates(df)
+    del df
+    generate_stats_summary(agg)
     print("\n生成图表中...")
-    plot_playlist_distribution(df)
-    plot_duration_distribution(df)
-    plot_top_artists(df)
-    plot_duration_by_playlist(df)
-    plot_pie_chart(df)
+    render_charts(agg)
     print("\n" + "="*50)
     print(f"可视化完成！图表已保存到 {OUTPUT_DIR}/ 目录")
     print("="*50)
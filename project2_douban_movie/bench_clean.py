@@ -0,0 +1,104 @@
+"""
+清洗性能对比：逐行 apply 的旧实现与向量化、类别类型的新实现
+用法: python bench_clean.py [行数，默认1000000]
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from data_clean import COLUMN_DTYPES, clean_frame
+
+REPEAT = 3  # 计时重复次数，取最快的一次
+
+REGIONS = ['中国大陆', '美国', '美国/英国', '日本', '韩国', '中国香港/中国大陆', '法国/德国/意大利', '', None]
+TYPES = ['剧情', '剧情/爱情', '喜剧/动作', '科幻/冒险/动作', '动画', '悬疑/犯罪', None]
+CATEGORIES = ['剧情', '喜剧', '动作', '爱情', '科幻', '动画', '悬疑', '惊悚', '恐怖', '纪录片']
+
+
+def make_frame(n, seed=0):
+    """构造与 load_data 结果类型相同的随机数据，约10%的电影ID重复"""
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(1000000, 1000000 + int(n * 0.9), n)
+    scores = np.round(rng.uniform(-1, 11, n), 1)
+    scores[rng.random(n) < 0.02] = np.nan
+    votes = pd.array(rng.integers(0, 2000000, n), dtype='Int64')
+    votes[rng.random(n) < 0.02] = pd.NA
+    df = pd.DataFrame({
+        'movie_id': ids.astype(str).astype(object),
+        'title': np.where(rng.random(n) < 0.01, None, 'title'),
+        'score': scores,
+        'vote_count': votes,
+        'release_date': '2020-01-01',
+        'regions': rng.choice(np.array(REGIONS, dtype=object), n),
+        'types': rng.choice(np.array(TYPES, dtype=object), n),
+        'actors': rng.choice(np.array(['演员甲/演员乙', '演员丙', None], dtype=object), n),
+        'movie_url': 'https://movie.douban.com/subject/1/',
+        'cover_url': 'https://img.doubanio.com/view/photo/1.jpg',
+        'category': rng.choice(np.array(CATEGORIES, dtype=object), n),
+    })
+    return df.astype(COLUMN_DTYPES)
+
+
+def legacy_clean(df):
+    """改为向量化之前的 clean_data 实现(去掉输出)"""
+    df = df.drop_duplicates(subset=['movie_id'], keep='first')
+    df = df.copy()
+    df['title'] = df['title'].fillna('未知电影')
+    df['actors'] = df['actors'].fillna('')
+    df['regions'] = df['regions'].fillna('未知')
+    df['types'] = df['types'].fillna('未知')
+    df['score'] = pd.to_numeric(df['score'], errors='coerce').fillna(0)
+    df['vote_count'] = pd.to_numeric(df['vote_count'], errors='coerce').fillna(0).astype(int)
+    df = df[df['score'] >= 0]
+    df = df[df['score'] <= 10]
+    df['main_region'] = df['regions'].apply(lambda x: x.split('/')[0] if x else '未知')
+    df['main_type'] = df['types'].apply(lambda x: x.split('/')[0] if x else '未知')
+    df['is_high_rating'] = df['score'] >= 8.5
+    return df
+
+
+def vectorized_clean(df):
+    return clean_frame(df)[0]
+
+
+def measure(name, func, df, repeat=REPEAT):
+    """返回 (结果, 耗时, 峰值内存, 结果占用)
+
+    tracemalloc 会明显拖慢大量小对象的分配，耗时取不开启跟踪的 repeat 次中最快的一次，
+    峰值内存在另一次开启 tracemalloc 的运行中统计
+    """
+    elapsed = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(df)
+        elapsed = min(elapsed, time.perf_counter() - started)
+        del result
+
+    tracemalloc.start()
+    result = func(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = result.memory_usage(deep=True).sum()
+    print(f"  {name:<8} 耗时 {elapsed:6.2f} 秒, 峰值内存 {peak / 1024 / 1024:8.1f} MB, "
+          f"结果占用 {size / 1024 / 1024:8.1f} MB")
+    return result, elapsed, peak, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print(f"行数: {n}")
+    df = make_frame(n)
+    old, old_time, old_peak, old_size = measure('旧实现', legacy_clean, df)
+    new, new_time, new_peak, new_size = measure('向量化', vectorized_clean, df)
+    print(f"  耗时为旧实现的 {new_time / old_time * 100:.1f}%，峰值内存 {new_peak / old_peak * 100:.1f}%，"
+          f"结果占用 {new_size / old_size * 100:.1f}%")
+
+    same = old.astype(str).equals(new.astype(str))
+    print(f"  清洗结果一致: {'是' if same else '否'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+记录类型内存对比：dict 与 __slots__ 记录
+用法: python bench_records.py [记录数，默认1000000]
+"""
+import sys
+import time
+import tracemalloc
+
+from records import Movie
+
+REPEAT = 3  # 计时重复次数，取最快的一次
+
+
+def make_dict(i):
+    return {
+        'movie_id': str(1000000 + i),
+        'title': f'电影{i}',
+        'score': 7.0 + i % 30 / 10,
+        'vote_count': 1000 + i * 7 % 900000,
+        'release_date': f'{1980 + i % 45}-01-01',
+        'regions': '美国/英国',
+        'types': '剧情/爱情',
+        'actors': f'演员{i % 8000}/演员{i % 9000}',
+        'movie_url': f'https://movie.douban.com/subject/{1000000 + i}/',
+        'cover_url': f'https://img.doubanio.com/view/photo/{1000000 + i}.jpg',
+        'category': '剧情',
+    }
+
+
+def make_record(i):
+    return Movie(**make_dict(i))
+
+
+def build(factory, values):
+    if factory is None:
+        return [dict(v) for v in values]
+    return [factory(**v) for v in values]
+
+
+def measure(name, factory, n, repeat=REPEAT):
+    """返回 (构建耗时, 容器与记录本身占用的字节数)
+
+    tracemalloc 会明显拖慢大量小对象的分配，耗时取不开启跟踪的 repeat 次构建中最快的一次，
+    占用在另一次开启 tracemalloc 的构建中统计
+    """
+    # 先构建字段值，只统计记录结构本身的开销
+    values = [make_dict(i) for i in range(n)]
+    elapsed = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        records = build(factory, values)
+        elapsed = min(elapsed, time.perf_counter() - started)
+        del records
+
+    tracemalloc.start()
+    records = build(factory, values)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    print(f"  {name:<12} 构建 {elapsed:6.2f} 秒, 占用 {size / 1024 / 1024:8.1f} MB, "
+          f"每条 {size / n:6.1f} 字节")
+    return elapsed, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print(f"记录数: {n}")
+    dict_time, dict_size = measure('dict', None, n)
+    slot_time, slot_size = measure('Movie', Movie, n)
+    print(f"  __slots__ 记录构建耗时为 dict 的 {slot_time / dict_time * 100:.1f}%，"
+          f"占用为 dict 的 {slot_size / dict_size * 100:.1f}%")
+
+    movie = make_record(0)
+    started = time.perf_counter()
+    for _ in range(n):
+        movie.to_row()
+    print(f"  to_row: {(time.perf_counter() - started) / n * 1e9:.0f} ns/条")
+    started = time.perf_counter()
+    for _ in range(n):
+        movie.to_document()
+    print(f"  to_document: {(time.perf_counter() - started) / n * 1e9:.0f} ns/条")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+图表缓存
+按图表所用汇总结果、绘图代码和参数的哈希判断能否复用上次生成的图片
+"""
+import hashlib
+import inspect
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class ChartCache:
+    """记录每个图表上次生成时的哈希，哈希不变且图片仍在时跳过重新绘制"""
+
+    def __init__(self, output_dir, manifest_name='chart_cache.json'):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, manifest_name)
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+        self.digests = {}
+        self.reused = []
+        self.rendered = []
+
+    def _digest(self, name, value):
+        """每个输入只哈希一次，多个图表共用"""
+        if name not in self.digests:
+            h = hashlib.blake2b(digest_size=16)
+            self._update(h, value)
+            self.digests[name] = h.hexdigest()
+        return self.digests[name]
+
+    def _update(self, h, value):
+        if isinstance(value, (pd.Series, pd.DataFrame)):
+            h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+            labels = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+            h.update(json.dumps([str(label) for label in labels]).encode('utf-8'))
+        elif isinstance(value, np.ndarray):
+            h.update(str(value.dtype).encode('utf-8'))
+            h.update(np.ascontiguousarray(value).tobytes())
+        elif isinstance(value, (tuple, list)):
+            for item in value:
+                self._update(h, item)
+        else:
+            h.update(json.dumps(value, sort_keys=True, default=str).encode('utf-8'))
+
+    def key(self, func, inputs, params=None):
+        """由绘图函数源码、参数和各项输入的内容计算哈希，inputs 为 {名称: 汇总结果}"""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(inspect.getsource(func).encode('utf-8'))
+        h.update(json.dumps(params or {}, sort_keys=True, default=str).encode('utf-8'))
+        for name, value in sorted(inputs.items()):
+            h.update(name.encode('utf-8'))
+            h.update(self._digest(name, value).encode('utf-8'))
+        return h.hexdigest()
+
+    def chart_path(self, name):
+        return os.path.join(self.output_dir, f'{name}.png')
+
+    def is_fresh(self, name, key):
+        entry = self.entries.get(name)
+        fresh = bool(entry) and entry.get('key') == key and os.path.exists(self.chart_path(name))
+        (self.reused if fresh else self.rendered).append(name)
+        return fresh
+
+    def record(self, name, key):
+        self.entries[name] = {'key': key, 'file': self.chart_path(name)}
+
+    def save(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def report(self):
+        print(f"✓ 图表缓存: 复用 {len(self.reused)} 个，重新生成 {len(self.rendered)} 个")
+        for name in self.reused:
+            print(f"  - 复用 {self.chart_path(name)}")
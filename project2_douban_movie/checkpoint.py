@@ -0,0 +1,38 @@
+"""
+爬取断点记录
+"""
+import json
+import os
+import time
+
+
+class CheckpointStore:
+    """定期把爬取进度写入本地文件，崩溃后可从断点继续"""
+
+    def __init__(self, path, interval=5.0):
+        self.path = path
+        self.interval = interval
+        self._saved_at = time.monotonic()
+
+    def due(self):
+        """距上次保存是否已超过间隔"""
+        return time.monotonic() - self._saved_at >= self.interval
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, state):
+        """先写临时文件再替换，避免写到一半崩溃留下损坏的断点"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._saved_at = time.monotonic()
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -2,71 +2,184 @@
 豆瓣电影爬虫
 爬取多个类型的高分电影数据
 """
-import requests
+import argparse
 import time
 import random
 import json
-from fake_useragent import UserAgent
-import pymysql
-from pymongo import MongoClient
-from config import MYSQL_CONFIG, MONGODB_CONFIG, CRAWL_CONFIG, MOVIE_TYPES
+from checkpoint import CheckpointStore
+from config import (
+    MYSQL_CONFIG, MYSQL_BATCH_CONFIG, MONGODB_CONFIG, CRAWL_CONFIG,
+    PIPELINE_CONFIG, CHECKPOINT_CONFIG, CACHE_CONFIG, BACKUP_CONFIG,
+    SEEN_INDEX_CONFIG, METRICS_CONFIG, HTTP_CONFIG, HEDGE_CONFIG, STARTUP_CONFIG, MOVIE_TYPES,
+)
+from http_cache import ResponseCache
+from http_client import Hedger, HttpClient, tuned_session
+from metrics import CrawlMetrics
+from pipeline import CrawlPipeline
+from seen_index import SeenIndex
+from records import Movie
+from prefetch import PagePrefetcher
+from storage import JsonlWriter, LazyConnection, MongoBulkSink, MySQLBatchSink
+from throttle import AdaptiveRate, RateBudget
+from ua_pool import UserAgentPool
+
+INSERT_MOVIE_SQL = """
+INSERT IGNORE INTO movies 
+(movie_id, title, score, vote_count, release_date, regions, 
+ types, actors, movie_url, cover_url, category)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+CREATE_MOVIES_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS movies (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    movie_id VARCHAR(50) UNIQUE,
+    title VARCHAR(500),
+    score DECIMAL(3,1),
+    vote_count INT,
+    release_date VARCHAR(50),
+    regions VARCHAR(200),
+    types VARCHAR(200),
+    actors VARCHAR(1000),
+    movie_url VARCHAR(500),
+    cover_url VARCHAR(500),
+    category VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
 
 
 class DoubanMovieCrawler:
     def __init__(self):
-        self.ua = UserAgent()
-        self.session = requests.Session()
+        self.metrics = CrawlMetrics(METRICS_CONFIG.get('namespace', 'crawler'))
+        self.ua = UserAgentPool(
+            STARTUP_CONFIG['ua_pool_path'],
+            size=STARTUP_CONFIG['ua_pool_size'],
+            ttl=STARTUP_CONFIG['ua_pool_ttl'],
+        )
+        self.session = tuned_session(
+            pool_connections=HTTP_CONFIG['pool_connections'],
+            pool_maxsize=HTTP_CONFIG['pool_maxsize'],
+        )
+        self.rate = None
+        if CRAWL_CONFIG.get('adaptive_rate'):
+            self.rate = AdaptiveRate(
+                CRAWL_CONFIG['rate_floor'], CRAWL_CONFIG['rate_ceiling'],
+                increase=CRAWL_CONFIG.get('rate_increase', 0.05),
+                decrease=CRAWL_CONFIG.get('rate_decrease', 0.5),
+                slow_latency=CRAWL_CONFIG.get('slow_latency', 5.0),
+            )
         self.movies = []
+        self.backup = None
+        if METRICS_CONFIG.get('prometheus_port'):
+            self.metrics.serve(METRICS_CONFIG['prometheus_port'])
         self.seen_ids = set()
+        self.checkpoint = CheckpointStore(
+            CHECKPOINT_CONFIG['path'], CHECKPOINT_CONFIG['interval']
+        )
+        self.http_cache = None
+        if CACHE_CONFIG.get('enabled'):
+            self.http_cache = ResponseCache(CACHE_CONFIG['dir'], CACHE_CONFIG['ttl'])
+        hedger = None
+        if HEDGE_CONFIG.get('enabled'):
+            hedger = Hedger(
+                percentile=HEDGE_CONFIG['percentile'],
+                budget=HEDGE_CONFIG['budget'],
+                min_delay=HEDGE_CONFIG['min_delay'],
+                initial_delay=HEDGE_CONFIG['initial_delay'],
+                min_samples=HEDGE_CONFIG['min_samples'],
+                workers=HEDGE_CONFIG['workers'],
+            )
+            self.metrics.attach('hedging', hedger.summary)
+        self.http = HttpClient(
+            self.session, self.metrics,
+            headers=self.get_headers,
+            rate=self.rate,
+            cache=self.http_cache,
+            connect_timeout=HTTP_CONFIG['connect_timeout'],
+            read_timeout=HTTP_CONFIG['read_timeout'],
+            retries=HTTP_CONFIG['retries'],
+            backoff_base=HTTP_CONFIG['backoff_base'],
+            backoff_max=HTTP_CONFIG['backoff_max'],
+            retry_status=HTTP_CONFIG['retry_status'],
+            hedger=hedger,
+        )
+        self.seen_index = None
+        self.known_skipped = 0
+        if SEEN_INDEX_CONFIG.get('enabled'):
+            self.seen_index = SeenIndex(
+                SEEN_INDEX_CONFIG['path'],
+                capacity=SEEN_INDEX_CONFIG['capacity'],
+                error_rate=SEEN_INDEX_CONFIG['error_rate'],
+            )
         self.init_mysql()
         self.init_mongodb()
     
     def init_mysql(self):
-        """初始化MySQL数据库"""
-        conn = pymysql.connect(
-            host=MYSQL_CONFIG['host'],
-            port=MYSQL_CONFIG['port'],
-            user=MYSQL_CONFIG['user'],
-            password=MYSQL_CONFIG['password'],
-            charset=MYSQL_CONFIG['charset']
+        """创建MySQL批量写入器，lazy_connect 时在第一次写入时才连接"""
+        self.mysql_conn = LazyConnection(self.connect_mysql)
+        self.mysql_sink = MySQLBatchSink(
+            self.mysql_conn, INSERT_MOVIE_SQL,
+            batch_size=MYSQL_BATCH_CONFIG['batch_size'],
+            flush_interval=MYSQL_BATCH_CONFIG['flush_interval'],
+            metrics=self.metrics,
         )
-        cursor = conn.cursor()
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {MYSQL_CONFIG['database']}")
-        conn.close()
-        
-        self.mysql_conn = pymysql.connect(**MYSQL_CONFIG)
-        self.mysql_cursor = self.mysql_conn.cursor()
+        if not STARTUP_CONFIG.get('lazy_connect', True):
+            self.mysql_conn.get()
+    
+    def connect_mysql(self):
+        """连接MySQL，数据库或数据表不存在时才创建"""
+        import pymysql
+        try:
+            conn = pymysql.connect(**MYSQL_CONFIG)
+        except pymysql.OperationalError as e:
+            if e.args[0] != 1049:  # Unknown database
+                raise
+            server = pymysql.connect(
+                host=MYSQL_CONFIG['host'],
+                port=MYSQL_CONFIG['port'],
+                user=MYSQL_CONFIG['user'],
+                password=MYSQL_CONFIG['password'],
+                charset=MYSQL_CONFIG['charset']
+            )
+            cursor = server.cursor()
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {MYSQL_CONFIG['database']}")
+            server.close()
+            conn = pymysql.connect(**MYSQL_CONFIG)
         
-        create_table_sql = """
-        CREATE TABLE IF NOT EXISTS movies (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            movie_id VARCHAR(50) UNIQUE,
-            title VARCHAR(500),
-            score DECIMAL(3,1),
-            vote_count INT,
-            release_date VARCHAR(50),
-            regions VARCHAR(200),
-            types VARCHAR(200),
-            actors VARCHAR(1000),
-            movie_url VARCHAR(500),
-            cover_url VARCHAR(500),
-            category VARCHAR(50),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-        """
-        self.mysql_cursor.execute(create_table_sql)
-        self.mysql_conn.commit()
+        cursor = conn.cursor()
+        if not cursor.execute("SHOW TABLES LIKE 'movies'"):
+            cursor.execute(CREATE_MOVIES_TABLE_SQL)
+            conn.commit()
+        cursor.close()
         print("✓ MySQL数据库初始化完成")
+        return conn
     
     def init_mongodb(self):
-        """初始化MongoDB"""
-        self.mongo_client = MongoClient(
+        """创建MongoDB写入器，lazy_connect 时在第一次写入时才连接"""
+        self.mongo_client = LazyConnection(self.connect_mongodb)
+        self.mongo_collection = LazyConnection(
+            lambda: self.mongo_client.get()[MONGODB_CONFIG['database']][MONGODB_CONFIG['collection_movies']]
+        )
+        self.mongo_sink = None
+        if MONGODB_CONFIG.get('bulk_write'):
+            self.mongo_sink = MongoBulkSink(
+                self.mongo_collection, 'movie_id',
+                batch_size=MONGODB_CONFIG.get('bulk_batch_size', 500),
+                metrics=self.metrics,
+            )
+        if not STARTUP_CONFIG.get('lazy_connect', True):
+            self.mongo_collection.get()
+    
+    def connect_mongodb(self):
+        """连接MongoDB"""
+        from pymongo import MongoClient
+        client = MongoClient(
             MONGODB_CONFIG['host'], 
             MONGODB_CONFIG['port']
         )
-        self.mongo_db = self.mongo_client[MONGODB_CONFIG['database']]
-        self.mongo_collection = self.mongo_db[MONGODB_CONFIG['collection_movies']]
         print("✓ MongoDB初始化完成")
+        return client
     
     def get_headers(self):
         """获取随机请求头"""
@@ -76,8 +189,8 @@ class DoubanMovieCrawler:
             'Referer': 'https://movie.douban.com/typerank',
         }
     
-    def fetch_movies(self, type_id, type_name, start=0, limit=50):
-        """获取电影列表"""
+    def movies_request(self, type_id, start=0, limit=50):
+        """电影列表接口的地址和参数"""
         url = 'https://movie.douban.com/j/chart/top_list'
         params = {
             'type': type_id,
@@ -86,16 +199,32 @@ class DoubanMovieCrawler:
             'start': start,
             'limit': limit
         }
+        return url, params
+    
+    def pause(self):
+        """未开启自适应限速时，每次请求之后随机等待"""
+        if self.rate is None:
+            delay = random.uniform(
+                CRAWL_CONFIG['delay_min'], 
+                CRAWL_CONFIG['delay_max']
+            )
+            time.sleep(delay)
+    
+    def fetch_movies(self, type_id, type_name, start=0, limit=50):
+        """获取电影列表"""
+        url, params = self.movies_request(type_id, start, limit)
         
         try:
-            response = self.session.get(
-                url, headers=self.get_headers(), 
-                params=params, timeout=15
-            )
+            response = self.http.get(url, params)
             if response.status_code == 200:
-                return response.json()
+                with self.metrics.timer('decode'):
+                    movies = response.json()
+                if not movies and self.http_cache:
+                    self.http_cache.discard(url, params)
+                return movies
             return []
         except Exception as e:
+            self.metrics.inc('request_failures')
             print(f"  请求失败: {e}")
             return []
     
@@ -103,141 +232,415 @@ class DoubanMovieCrawler:
         """解析电影数据"""
         try:
             movie_id = movie.get('id', '')
-            return {
-                'movie_id': str(movie_id),
-                'title': movie.get('title', ''),
-                'score': float(movie.get('score', 0)) if movie.get('score') else 0,
-                'vote_count': int(movie.get('vote_count', 0)),
-                'release_date': movie.get('release_date', ''),
-                'regions': '/'.join(movie.get('regions', [])),
-                'types': '/'.join(movie.get('types', [])),
-                'actors': '/'.join(movie.get('actors', [])[:5]),
-                'movie_url': movie.get('url', ''),
-                'cover_url': movie.get('cover_url', ''),
-                'category': category,
-            }
+            return Movie(
+                movie_id=str(movie_id),
+                title=movie.get('title', ''),
+                score=float(movie.get('score', 0)) if movie.get('score') else 0,
+                vote_count=int(movie.get('vote_count', 0)),
+                release_date=movie.get('release_date', ''),
+                regions='/'.join(movie.get('regions', [])),
+                types='/'.join(movie.get('types', [])),
+                actors='/'.join(movie.get('actors', [])[:5]),
+                movie_url=movie.get('url', ''),
+                cover_url=movie.get('cover_url', ''),
+                category=category,
+            )
         except Exception as e:
             print(f"  解析失败: {e}")
             return None
     
     def save_to_mysql(self, movie):
-        """保存到MySQL"""
-        try:
-            sql = """
-            INSERT IGNORE INTO movies 
-            (movie_id, title, score, vote_count, release_date, regions, 
-             types, actors, movie_url, cover_url, category)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            self.mysql_cursor.execute(sql, (
-                movie['movie_id'], movie['title'], movie['score'],
-                movie['vote_count'], movie['release_date'], movie['regions'],
-                movie['types'], movie['actors'], movie['movie_url'],
-                movie['cover_url'], movie['category'],
-            ))
-            self.mysql_conn.commit()
-            return True
-        except Exception as e:
-            print(f"  MySQL保存失败: {e}")
-            return False
+        """保存到MySQL（进入批量写入缓冲区）"""
+        return self.mysql_sink.add(movie.to_row())
     
     def save_to_mongodb(self, movie):
         """保存到MongoDB"""
+        document = movie.to_document()
+        if self.mongo_sink:
+            return self.mongo_sink.add(document)
         try:
-            self.mongo_collection.update_one(
-                {'movie_id': movie['movie_id']},
-                {'$set': movie},
-                upsert=True
-            )
+            with self.metrics.timer('mongodb'):
+                self.mongo_collection.update_one(
+                    {'movie_id': movie.movie_id},
+                    {'$set': document},
+                    upsert=True
+                )
+            self.metrics.inc('docs_written')
             return True
         except Exception as e:
             print(f"  MongoDB保存失败: {e}")
             return False
     
-    def crawl(self):
+    def crawl(self, resume=False):
         """执行爬取"""
         print("\n" + "="*50)
         print("豆瓣电影爬虫")
         print("="*50)
         
-        total_count = 0
+        state = self.load_checkpoint(resume)
+        self.open_backup(append=bool(state), keep=state.get('backup_records'))
+        total_count = state.get('total', 0)
+        first_type = state.get('type_index', 0)
         max_movies = CRAWL_CONFIG['max_movies']
         max_per_type = CRAWL_CONFIG.get('max_per_type', 200)
         
-        for movie_type in MOVIE_TYPES:
-            if total_count >= max_movies:
-                break
-            
-            type_id = movie_type['id']
-            type_name = movie_type['name']
-            print(f"\n正在爬取: {type_name} (type={type_id})")
-            
-            start = 0
-            type_count = 0
-            
-            while total_count < max_movies and type_count < max_per_type:
-                movies = self.fetch_movies(type_id, type_name, start)
-                
-                if not movies:
+        prefetcher = None
+        if CRAWL_CONFIG.get('mode') == 'prefetch':
+            # 开启自适应限速时由 HttpClient 控制速率，不再叠加令牌桶
+            budget = None
+            if self.rate is None:
+                budget = RateBudget(
+                    CRAWL_CONFIG.get('rate_limit', 0.5),
+                    CRAWL_CONFIG.get('rate_burst', 1),
+                )
+            prefetcher = PagePrefetcher(
+                self.fetch_movies, MOVIE_TYPES, budget,
+                workers=CRAWL_CONFIG.get('prefetch_workers', 3),
+                pages_ahead=CRAWL_CONFIG.get('prefetch_pages', 1),
+                types_ahead=CRAWL_CONFIG.get('prefetch_types', 2),
+                per_type=max_per_type,
+            )
+        
+        try:
+            for type_idx, movie_type in enumerate(MOVIE_TYPES[first_type:], first_type):
+                if total_count >= max_movies:
                     break
                 
-                for movie in movies:
-                    if total_count >= max_movies or type_count >= max_per_type:
+                type_id = movie_type['id']
+                type_name = movie_type['name']
+                print(f"\n正在爬取: {type_name} (type={type_id})")
+                
+                start = 0
+                type_count = 0
+                if type_idx == first_type:
+                    start = state.get('start', 0)
+                    type_count = state.get('type_count', 0)
+                
+                while total_count < max_movies and type_count < max_per_type:
+                    if prefetcher:
+                        movies = prefetcher.get(
+                            type_idx, start,
+                            type_remaining=max_per_type - type_count,
+                            total_remaining=max_movies - total_count,
+                        )
+                    else:
+                        movies = self.fetch_movies(type_id, type_name, start)
+                    
+                    if not movies:
                         break
                     
-                    movie_id = str(movie.get('id', ''))
-                    if movie_id in self.seen_ids:
-                        continue
+                    records, store = self.process_page(
+                        type_id, type_name, start, movies,
+                        min(max_movies - total_count, max_per_type - type_count)
+                    )
+                    for parsed in records:
+                        if store:
+                            self.save_to_mysql(parsed)
+                            self.save_to_mongodb(parsed)
+                        self.save_to_backup(parsed)
+                    total_count += len(records)
+                    type_count += len(records)
                     
-                    parsed = self.parse_movie(movie, type_name)
-                    if parsed:
-                        self.save_to_mysql(parsed)
-                        self.save_to_mongodb(parsed)
-                        self.movies.append(parsed)
-                        self.seen_ids.add(movie_id)
-                        total_count += 1
-                        type_count += 1
-                
-                print(f"  已爬取 {type_count} 部电影...")
-                start += 50
+                    print(f"  已爬取 {type_count} 部电影...")
+                    start += 50
+                    self.save_checkpoint(type_idx, start, type_count, total_count)
+                    
+                    if not prefetcher:
+                        self.pause()
+                    
+                    if len(movies) < 50:
+                        break
                 
-                delay = random.uniform(
-                    CRAWL_CONFIG['delay_min'], 
-                    CRAWL_CONFIG['delay_max']
+                if prefetcher:
+                    prefetcher.discard(type_idx)
+        finally:
+            if prefetcher:
+                prefetcher.close()
+        
+        return self.finish_crawl(total_count)
+    
+    def crawl_pipelined(self, resume=False):
+        """分阶段爬取：抓取、解析以及各存储分别在独立线程中进行"""
+        print("\n" + "="*50)
+        print("豆瓣电影爬虫 (流水线模式)")
+        print("="*50)
+        
+        checkpoint_state = self.load_checkpoint(resume)
+        self.open_backup(
+            append=bool(checkpoint_state), keep=checkpoint_state.get('backup_records')
+        )
+        first_type = checkpoint_state.get('type_index', 0)
+        max_movies = CRAWL_CONFIG['max_movies']
+        max_per_type = CRAWL_CONFIG.get('max_per_type', 200)
+        state = {'total': checkpoint_state.get('total', 0), 'type_counts': {},
+                 'done_types': set()}
+        if checkpoint_state:
+            type_id = MOVIE_TYPES[first_type]['id']
+            state['type_counts'][type_id] = checkpoint_state['type_count']
+            # 断点时该类型已取满，与串行模式一样不再请求该类型
+            if checkpoint_state['type_count'] >= max_per_type:
+                state['done_types'].add(type_id)
+        pipeline = CrawlPipeline(
+            queue_size=PIPELINE_CONFIG['queue_size'],
+            sink_queue_size=PIPELINE_CONFIG['sink_queue_size'],
+            report_interval=PIPELINE_CONFIG['report_interval'],
+        )
+        
+        def parse_stage(item):
+            # 按提交顺序逐页处理，上限和去重判断与串行模式一致
+            type_idx, start, movies = item
+            type_id = MOVIE_TYPES[type_idx]['id']
+            type_name = MOVIE_TYPES[type_idx]['name']
+            type_count = state['type_counts'].get(type_id, 0)
+            records, store = self.process_page(
+                type_id, type_name, start, movies,
+                min(max_movies - state['total'], max_per_type - type_count)
+            )
+            count = len(records)
+            if not store:
+                # 数据库中已有这些记录，只写入备份
+                records = [pipeline.route(r, 'json') for r in records]
+            type_count += count
+            state['type_counts'][type_id] = type_count
+            state['total'] += count
+            if type_count >= max_per_type:
+                state['done_types'].add(type_id)
+            if state['total'] >= max_movies:
+                pipeline.stop_event.set()
+            print(f"  {type_name} 已爬取 {type_count} 部电影...")
+            if self.checkpoint.due():
+                # 各存储写完本页之前的数据后再记录断点
+                checkpoint = self.crawl_state(
+                    type_idx, start + 50, type_count, state['total']
                 )
-                time.sleep(delay)
+                cached = self.http_cache.take_pending() if self.http_cache else ()
+                seen = self.seen_index.take_pending() if self.seen_index else ()
+                
+                def on_stored(positions):
+                    self.checkpoint.save({**checkpoint, 'backup_records': positions['json']})
+                    if self.http_cache:
+                        self.http_cache.commit(cached)
+                    if self.seen_index:
+                        self.seen_index.commit(seen)
                 
-                if len(movies) < 50:
+                records.append(pipeline.barrier(on_stored))
+            return records
+        
+        pipeline.set_parser(parse_stage)
+        pipeline.add_sink('mysql', self.save_to_mysql, flush=self.mysql_sink.flush)
+        pipeline.add_sink(
+            'mongodb', self.save_to_mongodb,
+            flush=self.mongo_sink.flush if self.mongo_sink else None,
+        )
+        pipeline.add_sink(
+            'json', self.save_to_backup,
+            flush=self.backup.flush, position=lambda: self.backup.count,
+        )
+        pipeline.start()
+        try:
+            for type_idx, movie_type in enumerate(MOVIE_TYPES[first_type:], first_type):
+                if pipeline.stop_event.is_set():
                     break
+                
+                type_id = movie_type['id']
+                type_name = movie_type['name']
+                print(f"\n正在爬取: {type_name} (type={type_id})")
+                
+                start = 0
+                if type_idx == first_type:
+                    start = checkpoint_state.get('start', 0)
+                while (not pipeline.stop_event.is_set()
+                       and type_id not in state['done_types']):
+                    movies = pipeline.fetch(self.fetch_movies, type_id, type_name, start)
+                    if not movies:
+                        break
+                    
+                    pipeline.submit((type_idx, start, movies))
+                    start += 50
+                    self.pause()
+                    
+                    if len(movies) < 50:
+                        break
+        finally:
+            pipeline.close()
+        
+        pipeline.report()
+        return self.finish_crawl(state['total'])
+    
+    def process_page(self, type_id, type_name, start, movies, limit):
+        """解析一页数据，返回记录和是否需要写库
         
+        页面内容与上次已入库的版本相同时数据库中已有这些记录，只写入备份。
+        页面未被 limit 截断时才记录该响应已入库，被截断的页面下次仍完整写库。
+        """
+        records = self.parse_page(movies, type_name, limit)
+        if not self.http_cache:
+            return records, True
+        url, params = self.movies_request(type_id, start)
+        if limit >= len(movies):
+            self.http_cache.mark_processed(url, params)
+        return records, not self.http_cache.is_unchanged(url, params)
+    
+    def parse_page(self, movies, type_name, limit):
+        """解析一页电影，跳过已爬取过的ID，最多返回limit部"""
+        records = []
+        with self.metrics.timer('parse'):
+            for movie in movies:
+                if len(records) >= limit:
+                    break
+                
+                movie_id = str(movie.get('id', ''))
+                if movie_id in self.seen_ids or self.is_known(movie_id):
+                    self.metrics.inc('duplicates_skipped')
+                    continue
+                
+                parsed = self.parse_movie(movie, type_name)
+                if parsed:
+                    records.append(parsed)
+                    self.seen_ids.add(movie_id)
+                    if self.seen_index:
+                        self.seen_index.add(movie_id)
+        self.metrics.inc('records_parsed', len(records))
+        return records
+    
+    def crawl_state(self, type_idx, start, type_count, total_count):
+        """当前爬取进度：下一页的位置、各项计数和已见过的ID"""
+        return {
+            'type_index': type_idx,
+            'start': start,
+            'type_count': type_count,
+            'total': total_count,
+            'seen_ids': list(self.seen_ids),
+        }
+    
+    def load_checkpoint(self, resume):
+        """续爬时读取断点，否则清除旧断点重新开始"""
+        if not resume:
+            self.checkpoint.clear()
+            return {}
+        state = self.checkpoint.load()
+        if not state:
+            print("✓ 未找到断点，从头开始爬取")
+            return {}
+        self.seen_ids.update(state['seen_ids'])
+        movie_type = MOVIE_TYPES[state['type_index']]
+        print(f"✓ 从断点继续: {movie_type['name']} start={state['start']}，"
+              f"已获取 {state['total']} 部电影")
+        return state
+    
+    def save_checkpoint(self, type_idx, start, type_count, total_count):
+        """到达保存间隔时先写出缓冲区再记录断点，保证断点之前的数据均已入库"""
+        if not self.checkpoint.due():
+            return
+        self.flush_sinks()
+        self.checkpoint.save({
+            **self.crawl_state(type_idx, start, type_count, total_count),
+            'backup_records': self.backup.count,
+        })
+    
+    def is_known(self, item_id):
+        """该ID在之前的运行中已入库"""
+        if self.seen_index is None or item_id in (None, ''):
+            return False
+        if item_id in self.seen_index:
+            self.known_skipped += 1
+            return True
+        return False
+    
+    def flush_sinks(self):
+        """写出各存储缓冲区中的数据"""
+        self.mysql_sink.flush()
+        if self.mongo_sink:
+            self.mongo_sink.flush()
+        self.backup.flush()
+        if self.http_cache:
+            self.http_cache.commit()
+        if self.seen_index:
+            self.seen_index.commit()
+    
+    def finish_crawl(self, total_count):
+        """输出汇总并备份数据"""
+        self.flush_sinks()
+        self.checkpoint.clear()
         print(f"\n{'='*50}")
         print(f"爬取完成！共获取 {total_count} 部电影")
         print(f"数据已保存到 MySQL 和 MongoDB")
         print(f"{'='*50}")
+        self.mysql_sink.report()
+        if self.mongo_sink:
+            self.mongo_sink.report()
+        if self.http_cache:
+            self.http_cache.report()
+        if self.rate:
+            self.rate.report()
+        self.http.report()
+        if self.seen_index:
+            print(f"✓ 已入库ID索引共 {self.seen_index.count} 个，"
+                  f"本次跳过 {self.known_skipped} 条已入库记录")
+        self.metrics.print_summary()
+        if METRICS_CONFIG.get('report_path'):
+            self.metrics.save(METRICS_CONFIG['report_path'])
+            print(f"✓ 运行统计已保存到 {METRICS_CONFIG['report_path']}")
         
-        self.save_to_json()
+        print(f"✓ 数据已逐条备份到 {self.backup.path}")
+        if BACKUP_CONFIG['keep_in_memory']:
+            self.save_to_json()
         return total_count
     
+    def open_backup(self, append=False, keep=None):
+        """打开JSONL备份文件，续爬时追加写入，并去掉断点之后写入的 keep 条以后的记录"""
+        if self.backup:
+            self.backup.close()
+        self.backup = JsonlWriter(
+            BACKUP_CONFIG['path'],
+            compression=BACKUP_CONFIG.get('compression'),
+            flush_every=BACKUP_CONFIG.get('flush_every', 100),
+            append=append,
+            keep=keep,
+        )
+    
+    def save_to_backup(self, movie):
+        """追加一条记录到JSONL备份，按配置同时保留在内存中"""
+        with self.metrics.timer('backup'):
+            self.backup.write(movie.to_document())
+        if BACKUP_CONFIG['keep_in_memory']:
+            self.movies.append(movie)
+    
     def save_to_json(self):
         """保存到JSON文件"""
         with open('data/movies.json', 'w', encoding='utf-8') as f:
-            json.dump(self.movies, f, ensure_ascii=False, indent=2)
+            json.dump([r.to_document() for r in self.movies], f, ensure_ascii=False, indent=2)
         print("✓ 数据已备份到 data/movies.json")
     
     def close(self):
         """关闭连接"""
-        self.mysql_cursor.close()
+        self.mysql_sink.close()
         self.mysql_conn.close()
+        if self.mongo_sink:
+            self.mongo_sink.close()
         self.mongo_client.close()
+        if self.backup:
+            self.backup.close()
+        if self.seen_index:
+            self.seen_index.close()
+        self.http.close()
+        self.metrics.close()
 
 
 if __name__ == '__main__':
     import os
+    parser = argparse.ArgumentParser(description='豆瓣电影爬虫')
+    parser.add_argument('--resume', action='store_true', help='从上次中断的位置继续爬取')
+    args = parser.parse_args()
+    
     os.makedirs('data', exist_ok=True)
     os.makedirs('output', exist_ok=True)
     
     crawler = DoubanMovieCrawler()
     try:
-        crawler.crawl()
+        if CRAWL_CONFIG.get('mode') == 'pipeline':
+            crawler.crawl_pipelined(resume=args.resume)
+        else:
+            crawler.crawl(resume=args.resume)
     finally:
         crawler.close()
@@ -0,0 +1,258 @@
+"""
+HTTP请求层：连接池、超时、重试、限速和对冲请求
+"""
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from throttle import retry_after_seconds
+
+
+def tuned_session(session=None, pool_connections=2, pool_maxsize=4):
+    """给 session 挂载指定大小的连接池
+
+    pool_connections 为缓存连接池的主机数，pool_maxsize 为每个主机保留的长连接数，
+    不小于同时进行的请求数时并发请求结束后连接都能放回池中复用，不必重新建立。
+    重试由 HttpClient 负责，连接池本身不重试。
+    """
+    session = session or requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def percentile(values, q):
+    """最近秩法分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(q / 100 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+class Hedger:
+    """对冲请求：请求超过近期耗时的 percentile 分位数仍未返回时再发一个备份请求，取先成功的结果
+
+    先返回200的请求胜出；两个都不是200时返回先完成的那个。
+    等待时间不少于 min_delay，样本不足 min_samples 时使用 initial_delay；
+    备份请求数不超过请求总数的 budget 比例。未被采用的请求在后台执行完后丢弃。
+    报告中比较主请求本身的 p99 与对冲后实际等待的 p99。
+    """
+
+    def __init__(self, percentile=95, budget=0.05, min_delay=0.5, initial_delay=3.0,
+                 min_samples=20, window=200, workers=8):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=window)
+        self.primary_latencies = []
+        self.observed_latencies = []
+        self.requests = 0
+        self.hedged = 0
+        self.backup_wins = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hedge')
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """发出备份请求之前等待的时间"""
+        with self._lock:
+            if len(self.latencies) < self.min_samples:
+                return self.initial_delay
+            return max(self.min_delay, percentile(self.latencies, self.percentile))
+
+    def _take_budget(self):
+        with self._lock:
+            if self.hedged + 1 > self.budget * self.requests:
+                return False
+            self.hedged += 1
+            return True
+
+    def _timed(self, send, samples=None):
+        started = time.perf_counter()
+        try:
+            return send()
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.latencies.append(elapsed)
+                if samples is not None:
+                    samples.append(elapsed)
+
+    def run(self, send):
+        """执行 send()，必要时再执行一次作为备份，返回先成功的结果"""
+        started = time.perf_counter()
+        with self._lock:
+            self.requests += 1
+        primary = self._executor.submit(self._timed, send, self.primary_latencies)
+        done, _ = wait([primary], timeout=self.delay())
+        if done or not self._take_budget():
+            try:
+                return primary.result()
+            finally:
+                self._observe(started)
+
+        backup = self._executor.submit(self._timed, send)
+        pending = {primary, backup}
+        first = None
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    first = first or future
+                    if future.exception() is None and self._succeeded(future.result()):
+                        if future is backup:
+                            with self._lock:
+                                self.backup_wins += 1
+                        return future.result()
+            return first.result()
+        finally:
+            self._observe(started)
+
+    @staticmethod
+    def _succeeded(response):
+        return getattr(response, 'status_code', 200) == 200
+
+    def _observe(self, started):
+        with self._lock:
+            self.observed_latencies.append(time.perf_counter() - started)
+
+    def summary(self):
+        with self._lock:
+            primary = list(self.primary_latencies)
+            observed = list(self.observed_latencies)
+            requests, hedged, wins = self.requests, self.hedged, self.backup_wins
+        return {
+            'requests': requests,
+            'hedged': hedged,
+            'hedge_rate': round(hedged / requests, 4) if requests else 0.0,
+            'backup_wins': wins,
+            'primary_p99_ms': round(percentile(primary, 99) * 1000, 1),
+            'observed_p99_ms': round(percentile(observed, 99) * 1000, 1),
+        }
+
+    def report(self):
+        s = self.summary()
+        print(f"✓ 对冲请求: 请求 {s['requests']} 次，对冲 {s['hedged']} 次 "
+              f"({s['hedge_rate'] * 100:.1f}%)，备份请求先返回 {s['backup_wins']} 次，"
+              f"p99 {s['primary_p99_ms']:.0f} ms -> {s['observed_p99_ms']:.0f} ms")
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _Transport:
+    """交给 ResponseCache 使用的 session 替身，每次 get 为一次实际的网络请求"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        return self.client._request(url, params, headers)
+
+
+class HttpClient:
+    """发送GET请求：按自适应速率等待、计时，失败时按抖动指数退避重试
+
+    连接错误、超时和 retry_status 中的状态码最多重试 retries 次，
+    第n次重试前等待 0~min(backoff_max, backoff_base * 2^n) 秒之间的随机时间，
+    服务器给出的 Retry-After(不超过 backoff_max)只在一处生效：有自适应速率时交给 rate，
+    暂停所有线程的下一次发送，重试前按退避时间等待后仍要等到该时刻；没有 rate 时由退避等待保证。
+    每次尝试都经过速率控制并计入运行统计。给出 hedger 时慢请求会发出备份请求，
+    备份请求不等待速率额度，数量由 hedger 的预算限制。
+    """
+
+    def __init__(self, session, metrics, headers=None, rate=None, cache=None,
+                 connect_timeout=3.05, read_timeout=15, retries=3,
+                 backoff_base=1.0, backoff_max=30.0, retry_status=(429, 500, 502, 503, 504),
+                 hedger=None):
+        self.session = session
+        self.metrics = metrics
+        self.headers = headers
+        self.rate = rate
+        self.cache = cache
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_status = set(retry_status)
+        self.hedger = hedger
+        self._transport = _Transport(self)
+
+    def get(self, url, params=None):
+        attempt = 0
+        while True:
+            try:
+                response = self._send(url, params)
+            except requests.RequestException:
+                if attempt >= self.retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if response.status_code not in self.retry_status or attempt >= self.retries:
+                    return response
+                delay = self._backoff(attempt, None if self.rate else self._retry_after(response))
+            attempt += 1
+            self.metrics.inc('retries')
+            time.sleep(delay)
+
+    def _retry_after(self, response):
+        retry_after = retry_after_seconds(response)
+        return min(retry_after, self.backoff_max) if retry_after else None
+
+    def _backoff(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _send(self, url, params):
+        """发送一次请求，命中未过期缓存时不占用速率额度"""
+        if self.rate and not (self.cache and self.cache.is_fresh(url, params)):
+            self.rate.wait()
+        headers = self.headers() if self.headers else None
+        if self.cache:
+            return self.cache.get(self._transport, url, params=params, headers=headers)
+        return self._request(url, params, headers)
+
+    def _request(self, url, params, headers):
+        """实际的网络请求，开启对冲时可能同时发出两个"""
+        if self.hedger is None:
+            return self._fetch(url, params, headers)
+        return self.hedger.run(lambda: self._fetch(url, params, headers))
+
+    def _fetch(self, url, params, headers):
+        self.metrics.mark_first_request()
+        self.metrics.inc('requests')
+        started = time.perf_counter()
+        try:
+            response = self.session.get(
+                url, headers=headers, params=params, timeout=self.timeout
+            )
+        except Exception:
+            if self.rate:
+                self.rate.record(None, time.perf_counter() - started)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.observe('http', elapsed)
+        self.metrics.record_response(response)
+        if self.rate:
+            self.rate.record(response.status_code, elapsed, self._retry_after(response))
+        return response
+
+    def report(self):
+        if self.hedger:
+            self.hedger.report()
+
+    def close(self):
+        if self.hedger:
+            self.hedger.close()
@@ -0,0 +1,220 @@
+"""
+爬取过程的耗时和吞吐量统计
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 直方图桶上界(秒)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 始终出现在报告中的计数器
+DEFAULT_COUNTERS = ('requests', 'request_failures', 'http_errors', 'retries',
+                    'bytes_received', 'records_parsed', 'rows_written',
+                    'docs_written', 'duplicates_skipped')
+
+
+class Histogram:
+    """固定分桶的耗时直方图，另记总次数、总耗时和最大值"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """按桶内均匀分布估计分位数"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, n in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.max
+            if n and seen + n >= target:
+                return min(lower + (upper - lower) * (target - seen) / n, self.max)
+            seen += n
+            lower = upper
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'seconds': round(self.sum, 4),
+            'mean_ms': round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.quantile(0.5) * 1000, 3),
+            'p90_ms': round(self.quantile(0.9) * 1000, 3),
+            'p99_ms': round(self.quantile(0.99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class CrawlMetrics:
+    """各阶段耗时直方图和计数器，可多线程共用
+
+    结束时用 save 写出JSON报告；serve 启动一个HTTP端口，
+    以 Prometheus 文本格式输出当前数值，便于长时间运行时查看。
+    从创建到第一次 mark_first_request 的时间记为启动耗时。
+    """
+
+    def __init__(self, namespace='crawler', counters=DEFAULT_COUNTERS, buckets=DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.buckets = buckets
+        self.counters = {name: 0 for name in counters}
+        self.stages = {}
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.sections = {}
+        self.first_request_at = None
+        self._lock = threading.Lock()
+        self._server = None
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """记录 with 块的耗时，出错时同样记录"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def mark_first_request(self):
+        """记录第一个请求发出的时间，之后的调用不做任何事"""
+        if self.first_request_at is None:
+            with self._lock:
+                if self.first_request_at is None:
+                    self.first_request_at = time.perf_counter()
+
+    def time_to_first_request(self):
+        if self.first_request_at is None:
+            return None
+        return self.first_request_at - self._started
+
+    def record_response(self, response):
+        """统计一次HTTP响应：状态码非200计为错误，缓存返回的内容不计入下载量"""
+        if response.status_code != 200:
+            self.inc('http_errors')
+        if not getattr(response, 'from_cache', False):
+            self.inc('bytes_received', len(response.content))
+
+    def attach(self, name, summary):
+        """报告中增加一项，summary() 在生成报告时调用"""
+        self.sections[name] = summary
+
+    def report(self):
+        """汇总为报告字典"""
+        elapsed = time.perf_counter() - self._started
+        first_request = self.time_to_first_request()
+        with self._lock:
+            counters = dict(self.counters)
+            stages = {name: h.summary() for name, h in self.stages.items()}
+        return {
+            'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at)),
+            'elapsed_seconds': round(elapsed, 3),
+            'time_to_first_request_seconds': round(first_request, 4) if first_request is not None else None,
+            'records_per_second': round(counters.get('records_parsed', 0) / elapsed, 2) if elapsed else 0.0,
+            'bytes_per_second': round(counters.get('bytes_received', 0) / elapsed, 1) if elapsed else 0.0,
+            'counters': counters,
+            'stages': stages,
+            **{name: summary() for name, summary in self.sections.items()},
+        }
+
+    def save(self, path):
+        """先写临时文件再替换"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def print_summary(self):
+        report = self.report()
+        counters = report['counters']
+        print(f"✓ 运行统计: 请求 {counters['requests']} 次 (异常 {counters['request_failures']}，"
+              f"非200 {counters['http_errors']}，重试 {counters['retries']})，"
+              f"下载 {counters['bytes_received'] / 1024:.1f} KB，"
+              f"解析 {report['records_per_second']:.1f} 条/秒")
+        if report['time_to_first_request_seconds'] is not None:
+            print(f"  - 启动到发出第一个请求: {report['time_to_first_request_seconds'] * 1000:.0f} ms")
+        for name, stats in report['stages'].items():
+            print(f"  - {name}: {stats['count']} 次, 共 {stats['seconds']:.2f} 秒, "
+                  f"p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms")
+
+    def prometheus_text(self):
+        """Prometheus 文本格式"""
+        ns = self.namespace
+        with self._lock:
+            counters = dict(self.counters)
+            stages = {name: (list(h.counts), h.count, h.sum) for name, h in self.stages.items()}
+        lines = []
+        for name, value in counters.items():
+            lines.append(f'# TYPE {ns}_{name}_total counter')
+            lines.append(f'{ns}_{name}_total {value}')
+        lines.append(f'# TYPE {ns}_stage_seconds histogram')
+        for stage, (counts, count, total) in stages.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f'{ns}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{ns}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{ns}_stage_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{ns}_stage_seconds_count{{stage="{stage}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """在后台线程中提供 /metrics"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"✓ 运行指标: http://{host}:{self._server.server_address[1]}/metrics")
+
+    def close(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,201 @@
+"""
+分阶段流水线：抓取 -> 解析 -> 存储
+"""
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class StageStats:
+    """单个阶段的处理数量和耗时"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, error=False):
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += seconds
+            if error:
+                self.errors += 1
+
+    def throughput(self):
+        """每秒处理条数（只计算实际处理时间，不含排队等待）"""
+        if not self.busy_seconds:
+            return 0.0
+        return self.items / self.busy_seconds
+
+
+class Barrier:
+    """检查点标记：所有存储阶段都处理到该位置后执行回调
+
+    各存储阶段到达时记下自己的位置(如备份文件中的记录数)，
+    最后一个到达的阶段以 {名称: 位置} 调用 callback。
+    """
+
+    def __init__(self, callback, parties):
+        self.callback = callback
+        self.remaining = parties
+        self.positions = {}
+        self._lock = threading.Lock()
+
+    def arrive(self, name=None, position=None):
+        with self._lock:
+            if name is not None:
+                self.positions[name] = position
+            self.remaining -= 1
+            done = self.remaining == 0
+        if done:
+            self.callback(self.positions)
+
+
+class Route:
+    """只交给指定存储阶段的记录"""
+
+    def __init__(self, item, sinks):
+        self.item = item
+        self.sinks = sinks
+
+
+class Stage(threading.Thread):
+    """从输入队列取数据处理，并把结果分发到下游队列，outputs 为 {名称: 队列}"""
+
+    def __init__(self, name, handler, in_queue, outputs=None, flush=None, position=None):
+        super().__init__(name=name, daemon=True)
+        self.handler = handler
+        self.in_queue = in_queue
+        self.outputs = outputs if outputs is not None else {}
+        self.flush = flush
+        self.position = position
+        self.stats = StageStats(name)
+
+    def run(self):
+        while True:
+            item = self.in_queue.get()
+            if item is _STOP:
+                break
+            if isinstance(item, Barrier):
+                if self.flush:
+                    self.flush()
+                item.arrive(self.name, self.position() if self.position else None)
+                continue
+            started = time.perf_counter()
+            error = False
+            try:
+                results = self.handler(item)
+            except Exception as e:
+                print(f"  [{self.name}] 处理失败: {e}")
+                results = None
+                error = True
+            self.stats.record(time.perf_counter() - started, error)
+            if not self.outputs or not results:
+                continue
+            # 下游队列已满时在此阻塞，形成反压
+            for result in results:
+                for name, out_queue in self.outputs.items():
+                    if not isinstance(result, Route):
+                        out_queue.put(result)
+                    elif name in result.sinks:
+                        out_queue.put(result.item)
+
+
+class CrawlPipeline:
+    """抓取线程提交原始页面，解析线程产出记录，每个存储各自占用一个线程"""
+
+    def __init__(self, queue_size=4, sink_queue_size=1000, report_interval=10):
+        self.parse_queue = queue.Queue(maxsize=queue_size)
+        self.sink_queue_size = sink_queue_size
+        self.report_interval = report_interval
+        self.sink_queues = {}
+        self.parser = None
+        self.sinks = []
+        self.fetch_stats = StageStats('fetch')
+        self.stop_event = threading.Event()
+        self._closed = threading.Event()
+        self._started_at = None
+
+    def set_parser(self, handler):
+        """handler(item) 返回该页解析出的记录列表"""
+        self.parser = Stage('parse', handler, self.parse_queue, outputs=self.sink_queues)
+
+    def add_sink(self, name, handler, flush=None, position=None):
+        """handler(record) 保存单条记录，flush() 在检查点处写出缓冲区，
+        position() 返回检查点处的写入位置，传给检查点回调"""
+        sink_queue = queue.Queue(maxsize=self.sink_queue_size)
+        self.sink_queues[name] = sink_queue
+        self.sinks.append(Stage(name, handler, sink_queue, flush=flush, position=position))
+
+    def route(self, record, *sinks):
+        """由解析阶段返回，记录只交给指定名称的存储"""
+        return Route(record, sinks)
+
+    def barrier(self, callback):
+        """由解析阶段放在记录之后，所有存储都处理完之前的记录后执行callback(positions)"""
+        return Barrier(callback, len(self.sinks))
+
+    def fetch(self, func, *args):
+        """在抓取阶段执行一次请求并计时"""
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.fetch_stats.record(time.perf_counter() - started)
+
+    def submit(self, item):
+        """提交给解析阶段，队列已满时阻塞"""
+        self.parse_queue.put(item)
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self.parser.start()
+        for sink in self.sinks:
+            sink.start()
+        if self.report_interval:
+            threading.Thread(target=self._monitor, daemon=True).start()
+
+    def close(self):
+        """依次结束解析阶段和各存储阶段，等待队列中的数据处理完"""
+        self.parse_queue.put(_STOP)
+        self.parser.join()
+        for sink in self.sinks:
+            sink.in_queue.put(_STOP)
+        for sink in self.sinks:
+            sink.join()
+        self._closed.set()
+
+    def snapshot(self):
+        """当前各队列深度和各阶段统计"""
+        stages = [self.fetch_stats, self.parser.stats] + [s.stats for s in self.sinks]
+        return {
+            'queues': {
+                'parse': self.parse_queue.qsize(),
+                **{name: q.qsize() for name, q in self.sink_queues.items()},
+            },
+            'stages': {
+                s.name: {
+                    'items': s.items,
+                    'errors': s.errors,
+                    'busy_seconds': round(s.busy_seconds, 3),
+                    'throughput': round(s.throughput(), 1),
+                }
+                for s in stages
+            },
+        }
+
+    def _monitor(self):
+        while not self._closed.wait(self.report_interval):
+            depths = self.snapshot()['queues']
+            print("  [队列] " + ", ".join(f"{k}={v}" for k, v in depths.items()))
+
+    def report(self):
+        elapsed = time.perf_counter() - self._started_at
+        print(f"\n流水线统计 (总耗时 {elapsed:.2f} 秒):")
+        for name, stats in self.snapshot()['stages'].items():
+            print(f"  - {name}: {stats['items']} 项, 错误 {stats['errors']}, "
+                  f"处理耗时 {stats['busy_seconds']:.2f} 秒, {stats['throughput']:.1f} 项/秒")
@@ -0,0 +1,94 @@
+"""
+分页预取
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PagePrefetcher:
+    """在后台线程中提前获取后续页面和后续类型的首页
+
+    页面按 (类型序号, start) 取用，调用方仍按原顺序逐页处理，
+    因此去重和数量上限的判断与串行爬取完全一致。
+    只预取按剩余数量仍可能需要的页面；某个类型出现不满一页的页面后，
+    不再获取该类型后面的页面。尚未发出的预取请求在类型结束(discard)后直接放弃。
+    budget 为 None 时不经过令牌桶，由 HttpClient 的自适应限速控制速率。
+    """
+
+    def __init__(self, fetch, movie_types, budget=None, workers=3,
+                 pages_ahead=1, types_ahead=2, limit=50, per_type=None):
+        self.fetch = fetch
+        self.movie_types = movie_types
+        self.budget = budget
+        self.pages_ahead = pages_ahead
+        self.types_ahead = types_ahead
+        self.limit = limit
+        self.per_type = per_type
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._futures = {}
+        self._ends = {}
+        self._discarded = set()
+        self._lock = threading.Lock()
+
+    def _unwanted(self, type_idx, start):
+        with self._lock:
+            return type_idx in self._discarded or start > self._ends.get(type_idx, start)
+
+    def _fetch(self, type_idx, start):
+        if self._unwanted(type_idx, start):
+            return None
+        if self.budget:
+            self.budget.acquire()
+            if self._unwanted(type_idx, start):
+                return None
+        movie_type = self.movie_types[type_idx]
+        movies = self.fetch(movie_type['id'], movie_type['name'], start, self.limit)
+        if not movies or len(movies) < self.limit:
+            with self._lock:
+                self._ends[type_idx] = min(self._ends.get(type_idx, start), start)
+        return movies
+
+    def _schedule(self, type_idx, start):
+        key = (type_idx, start)
+        if key not in self._futures and not self._unwanted(type_idx, start):
+            self._futures[key] = self._executor.submit(self._fetch, type_idx, start)
+
+    def get(self, type_idx, start, type_remaining=None, total_remaining=None):
+        """返回指定页面，同时安排后续页面的预取
+
+        type_remaining / total_remaining 为当前类型和总共还需要的数量，
+        按每页都是新电影估计，只预取达到上限之前可能用到的页面。
+        """
+        key = (type_idx, start)
+        if key not in self._futures:
+            self._futures[key] = self._executor.submit(self._fetch, type_idx, start)
+        wanted = min(n for n in (type_remaining, total_remaining, float('inf')) if n is not None)
+        for i in range(1, self.pages_ahead + 1):
+            if i * self.limit >= wanted:
+                break
+            self._schedule(type_idx, start + i * self.limit)
+
+        # 当前类型取满后总数仍未达到上限时才需要后续类型
+        left = total_remaining if total_remaining is not None else float('inf')
+        left -= wanted
+        last = min(type_idx + 1 + self.types_ahead, len(self.movie_types))
+        for next_idx in range(type_idx + 1, last):
+            if left <= 0:
+                break
+            self._schedule(next_idx, 0)
+            if self.per_type is not None:
+                left -= self.per_type
+        return self._futures.pop(key).result()
+
+    def discard(self, type_idx):
+        """丢弃某个类型已不再需要的预取页面，已发出的请求不受影响"""
+        with self._lock:
+            self._discarded.add(type_idx)
+        for key in [k for k in self._futures if k[0] == type_idx]:
+            self._futures.pop(key).cancel()
+
+    def close(self):
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self._executor.shutdown(wait=True)
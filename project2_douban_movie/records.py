@@ -0,0 +1,41 @@
+"""
+解析后的记录类型
+"""
+
+
+class Movie:
+    """电影记录，使用 __slots__ 省去每条记录的 __dict__"""
+
+    __slots__ = (
+        'movie_id', 'title', 'score', 'vote_count', 'release_date', 'regions',
+        'types', 'actors', 'movie_url', 'cover_url', 'category',
+    )
+
+    def __init__(self, movie_id, title, score, vote_count, release_date, regions,
+                 types, actors, movie_url, cover_url, category):
+        self.movie_id = movie_id
+        self.title = title
+        self.score = score
+        self.vote_count = vote_count
+        self.release_date = release_date
+        self.regions = regions
+        self.types = types
+        self.actors = actors
+        self.movie_url = movie_url
+        self.cover_url = cover_url
+        self.category = category
+
+    def to_row(self):
+        """MySQL插入参数，字段顺序与 __slots__ 及 movies 表插入语句一致"""
+        return (
+            self.movie_id, self.title, self.score, self.vote_count,
+            self.release_date, self.regions, self.types, self.actors,
+            self.movie_url, self.cover_url, self.category,
+        )
+
+    def to_document(self):
+        """MongoDB文档 / JSON备份使用的字典"""
+        return dict(zip(self.__slots__, self.to_row()))
+
+    def __repr__(self):
+        return f'Movie({self.movie_id!r}, {self.title!r})'
@@ -0,0 +1,288 @@
+"""
+数据存储
+"""
+import gzip
+import io
+import json
+import os
+import threading
+import time
+import zlib
+
+
+class LazyConnection:
+    """第一次使用时才调用 connect() 建立的连接，属性访问转发给真正的连接
+
+    未建立连接时 close 不做任何事，不会为了关闭而连接。
+    """
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def opened(self):
+        return self._conn is not None
+
+    def get(self):
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    self._conn = self._connect()
+        return self._conn
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+
+
+class MySQLBatchSink:
+    """MySQL批量写入：缓冲记录，按批次 executemany 并只提交一次
+
+    游标在第一次写入时才创建，conn 为 LazyConnection 时连接也随之建立。
+    """
+
+    def __init__(self, conn, sql, batch_size=100, flush_interval=2.0, metrics=None):
+        self.conn = conn
+        self.cursor = None
+        self.sql = sql
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.buffered_at = None
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.batches = 0
+        self.write_seconds = 0.0
+        self.metrics = metrics
+
+    def add(self, row):
+        """加入一行参数元组，达到批量大小或时间窗口时写入"""
+        if not self.buffer:
+            self.buffered_at = time.monotonic()
+        self.buffer.append(row)
+        if (len(self.buffer) >= self.batch_size
+                or time.monotonic() - self.buffered_at >= self.flush_interval):
+            return self.flush()
+        return True
+
+    def flush(self):
+        """写入缓冲区中的全部记录"""
+        if not self.buffer:
+            return True
+        rows, self.buffer = self.buffer, []
+        written = self.rows_written
+        started = time.perf_counter()
+        if self.cursor is None:
+            self.cursor = self.conn.cursor()
+        try:
+            self.cursor.executemany(self.sql, rows)
+            self.conn.commit()
+            self.rows_written += len(rows)
+            ok = True
+        except Exception as e:
+            print(f"  MySQL批量保存失败，改为逐条写入: {e}")
+            self.conn.rollback()
+            ok = self._write_rows(rows)
+        elapsed = time.perf_counter() - started
+        self.write_seconds += elapsed
+        self.batches += 1
+        if self.metrics:
+            self.metrics.observe('mysql', elapsed)
+            self.metrics.inc('rows_written', self.rows_written - written)
+        return ok
+
+    def _write_rows(self, rows):
+        """批量失败时逐条写入，跳过出错的记录"""
+        ok = True
+        for row in rows:
+            try:
+                self.cursor.execute(self.sql, row)
+                self.rows_written += 1
+            except Exception as e:
+                print(f"  MySQL保存失败: {e}")
+                self.rows_failed += 1
+                ok = False
+        self.conn.commit()
+        return ok
+
+    def rows_per_second(self):
+        if not self.write_seconds:
+            return 0.0
+        return self.rows_written / self.write_seconds
+
+    def report(self):
+        print(f"✓ MySQL写入 {self.rows_written} 条 (失败 {self.rows_failed} 条)，"
+              f"共 {self.batches} 批，耗时 {self.write_seconds:.2f} 秒，"
+              f"{self.rows_per_second():.0f} 条/秒")
+
+    def close(self):
+        self.flush()
+        if self.cursor is not None:
+            self.cursor.close()
+
+
+class MongoBulkSink:
+    """MongoDB批量写入：缓冲文档，以无序 bulk_write 发送 upsert 操作
+
+    pymongo 在第一次写入时才导入，collection 为 LazyConnection 时连接也随之建立。
+    """
+
+    def __init__(self, collection, key, batch_size=500, metrics=None):
+        self.collection = collection
+        self.key = key
+        self.batch_size = batch_size
+        self.docs = []
+        self.docs_written = 0
+        self.docs_failed = 0
+        self.batches = 0
+        self.write_seconds = 0.0
+        self.metrics = metrics
+
+    def add(self, doc):
+        """按主键加入一个 upsert 操作，缓冲区满时写入"""
+        self.docs.append(doc)
+        if len(self.docs) >= self.batch_size:
+            return self.flush()
+        return True
+
+    def flush(self):
+        """发送缓冲区中的全部操作，单条失败不影响同批其他文档"""
+        if not self.docs:
+            return True
+        from pymongo import UpdateOne
+        from pymongo.errors import BulkWriteError, PyMongoError
+        docs, self.docs = self.docs, []
+        keys = [doc[self.key] for doc in docs]
+        ops = [UpdateOne({self.key: key}, {'$set': doc}, upsert=True) for key, doc in zip(keys, docs)]
+        written = self.docs_written
+        started = time.perf_counter()
+        ok = True
+        try:
+            self.collection.bulk_write(ops, ordered=False)
+            self.docs_written += len(ops)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            for error in errors:
+                print(f"  MongoDB保存失败 ({self.key}={keys[error['index']]}): "
+                      f"{error.get('errmsg')}")
+            self.docs_failed += len(errors)
+            self.docs_written += len(ops) - len(errors)
+            ok = False
+        except PyMongoError as e:
+            print(f"  MongoDB批量保存失败: {e}")
+            self.docs_failed += len(ops)
+            ok = False
+        elapsed = time.perf_counter() - started
+        self.write_seconds += elapsed
+        self.batches += 1
+        if self.metrics:
+            self.metrics.observe('mongodb', elapsed)
+            self.metrics.inc('docs_written', self.docs_written - written)
+        return ok
+
+    def report(self):
+        rate = self.docs_written / self.write_seconds if self.write_seconds else 0.0
+        print(f"✓ MongoDB写入 {self.docs_written} 条 (失败 {self.docs_failed} 条)，"
+              f"共 {self.batches} 批，耗时 {self.write_seconds:.2f} 秒，{rate:.0f} 条/秒")
+
+    def close(self):
+        self.flush()
+
+
+class JsonlWriter:
+    """逐条追加写入 JSON Lines 备份，可选 gzip / zstd 压缩
+
+    count 为文件中的记录总数，续写时包含已有的记录；断点中保存该值，
+    续爬时传入 keep 只保留前 keep 条，丢弃断点之后写入、将被重新爬取的记录。
+    """
+
+    def __init__(self, path, compression=None, flush_every=100, append=False, keep=None):
+        if compression == 'gzip':
+            path += '.gz'
+        elif compression == 'zstd':
+            path += '.zst'
+        self.path = path
+        self.compression = compression
+        self.flush_every = flush_every
+        self.count = self._trim(keep) if append else 0
+        self.file = self._open('a' if append else 'w')
+
+    def _zstandard(self):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd 压缩需要先安装 zstandard: pip install zstandard")
+        return zstandard
+
+    def _open(self, mode):
+        if self.compression == 'gzip':
+            return gzip.open(self.path, mode + 't', encoding='utf-8')
+        if self.compression == 'zstd':
+            raw = open(self.path, mode + 'b')
+            if mode == 'r':
+                reader = self._zstandard().ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+                return io.TextIOWrapper(reader, encoding='utf-8')
+            return io.TextIOWrapper(
+                self._zstandard().ZstdCompressor().stream_writer(raw), encoding='utf-8'
+            )
+        return open(self.path, mode, encoding='utf-8')
+
+    def _trim(self, keep=None):
+        """统计已有的完整记录数，去掉 keep 条之后的记录和写到一半的最后一行"""
+        if not os.path.exists(self.path):
+            return 0
+        if self.compression is None:
+            offset = count = 0
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if count == keep or not line.endswith(b'\n'):
+                        break
+                    offset += len(line)
+                    count += 1
+            if offset < os.path.getsize(self.path):
+                with open(self.path, 'r+b') as f:
+                    f.truncate(offset)
+                print(f"✓ 备份文件截断到断点位置，保留 {count} 条记录")
+            return count
+
+        # 压缩文件无法按位置截断，需要时把保留的记录重新写入新文件
+        broken = (EOFError, OSError, ValueError, zlib.error)
+        if self.compression == 'zstd':
+            broken += (self._zstandard().ZstdError,)
+        lines = []
+        truncated = False
+        try:
+            with self._open('r') as f:
+                for line in f:
+                    if len(lines) == keep or not line.endswith('\n'):
+                        truncated = True
+                        break
+                    lines.append(line)
+        except broken:
+            truncated = True
+        if truncated:
+            final_path = self.path
+            self.path = final_path + '.tmp'
+            with self._open('w') as f:
+                f.writelines(lines)
+            os.replace(self.path, final_path)
+            self.path = final_path
+            print(f"✓ 备份文件截断到断点位置，保留 {len(lines)} 条记录")
+        return len(lines)
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
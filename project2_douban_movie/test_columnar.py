@@ -0,0 +1,42 @@
+"""
+列式存储测试: pytest test_columnar.py
+"""
+import pandas as pd
+import pytest
+
+from columnar import ColumnarWriter, dataset_parts, read_columnar
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_chunks_with_disjoint_categories(tmp_path, fmt):
+    """两块数据的类别集合互不相同时，两种格式都能写入并读回全部类别"""
+    path = str(tmp_path / f'cleaned.{fmt}')
+    writer = ColumnarWriter(path, fmt, compression=None, row_group_size=2)
+    writer.write(pd.DataFrame({'id': [1, 2], 'category': pd.Categorical(['剧情', '喜剧'])}))
+    writer.write(pd.DataFrame({'id': [3, 4], 'category': pd.Categorical(['动作', '科幻'])}))
+    writer.close()
+
+    df = read_columnar(path)
+    assert df['id'].tolist() == [1, 2, 3, 4]
+    assert df['category'].tolist() == ['剧情', '喜剧', '动作', '科幻']
+    assert isinstance(df['category'].dtype, pd.CategoricalDtype)
+    assert sorted(df['category'].cat.categories) == sorted(['剧情', '喜剧', '动作', '科幻'])
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_append_adds_part(tmp_path, fmt):
+    """追加时新增一个分片，不改写已有分片；全量写入时只保留本次的分片"""
+    path = str(tmp_path / f'cleaned.{fmt}')
+    for ids, category in (([1, 2], '剧情'), ([3], '动作')):
+        writer = ColumnarWriter(path, fmt, compression=None, append=True)
+        writer.write(pd.DataFrame({'id': ids, 'category': pd.Categorical([category] * len(ids))}))
+        writer.close()
+    first = dataset_parts(path)[0]
+    assert len(dataset_parts(path)) == 2
+    assert read_columnar(path)['id'].tolist() == [1, 2, 3]
+
+    writer = ColumnarWriter(path, fmt, compression=None)
+    writer.write(pd.DataFrame({'id': [4], 'category': pd.Categorical(['剧情'])}))
+    writer.close()
+    assert dataset_parts(path) == [first]
+    assert read_columnar(path)['id'].tolist() == [4]
@@ -0,0 +1,55 @@
+"""
+预先生成的User-Agent列表
+"""
+import json
+import os
+import random
+import time
+
+
+class UserAgentPool:
+    """从本地文件加载User-Agent列表，文件不存在或过期时用 fake_useragent 生成一次并保存
+
+    用法与 fake_useragent.UserAgent 相同，random 属性每次随机返回一个；
+    列表有效期内启动时不必导入 fake_useragent。重新生成失败时继续使用过期的列表。
+    """
+
+    def __init__(self, path, size=200, ttl=7 * 24 * 3600):
+        self.path = path
+        self.size = size
+        self.ttl = ttl
+        self.agents = self._load()
+
+    def _load(self):
+        generated_at, agents = 0, []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            generated_at, agents = data['generated_at'], data['agents']
+        except (OSError, ValueError, KeyError):
+            pass
+        if agents and time.time() - generated_at < self.ttl:
+            return agents
+        try:
+            return self._generate()
+        except Exception as e:
+            if not agents:
+                raise
+            print(f"  User-Agent列表重新生成失败，继续使用旧列表: {e}")
+            return agents
+
+    def _generate(self):
+        from fake_useragent import UserAgent
+        ua = UserAgent()
+        agents = sorted({ua.random for _ in range(self.size)})
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'generated_at': time.time(), 'agents': agents}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        print(f"✓ 已生成 {len(agents)} 个User-Agent，保存到 {self.path}")
+        return agents
+
+    @property
+    def random(self):
+        return random.choice(self.agents)
@@ -1,12 +1,19 @@
 """
 数据可视化分析
 """
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib
+from matplotlib.colors import LogNorm
 from collections import Counter
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import warnings
+from config import OUTPUT_CONFIG, VISUALIZE_CONFIG
+from columnar import dataset_parts, read_columnar
+from chart_cache import ChartCache
 warnings.filterwarnings('ignore')
 
 matplotlib.rcParams['font.sans-serif'] = ['Heiti SC', 'STHeiti', 'PingFang SC', 'Hiragino Sans GB', 'Arial Unicode MS']
@@ -14,17 +21,76 @@ matplotlib.rcParams['font.family'] = 'sans-serif'
 matplotlib.rcParams['axes.unicode_minus'] = False
 
 OUTPUT_DIR = 'output'
+# 各图表和统计用到的字段，只加载这些列
+CHART_COLUMNS = {
+    'stats': ['score', 'category', 'main_region'],
+    'score_distribution': ['score'],
+    'category_distribution': ['category'],
+    'region_distribution': ['main_region'],
+    'score_by_category': ['category', 'score'],
+    'top_movies': ['title', 'score', 'category'],
+    'votes_vs_score': ['vote_count', 'score'],
+}
+# 各图表用到的汇总结果，见 build_aggregates
+CHART_AGGREGATES = {
+    'score_distribution': ['score_hist', 'score_mean'],
+    'category_distribution': ['category_counts'],
+    'region_distribution': ['region_counts'],
+    'score_by_category': ['avg_score_by_category'],
+    'top_movies': ['top_movies'],
+    'votes_vs_score': ['votes_scores', 'votes_density'],
+}
+TOP_N = 15
 
 
-def load_data():
-    return pd.read_csv('data/movies_cleaned.csv')
+def load_data(columns=None):
+    """读取清洗后的数据，有列式数据集时只读取所需字段"""
+    base_path = OUTPUT_CONFIG['base_path']
+    fmt = OUTPUT_CONFIG.get('columnar')
+    if fmt and dataset_parts(f'{base_path}.{fmt}'):
+        return read_columnar(f'{base_path}.{fmt}', columns)
+    return pd.read_csv(f'{base_path}.csv', usecols=columns)
 
 
-def plot_score_distribution(df):
+def votes_vs_score_inputs(df):
+    """
+    评分-评价人数图的输入：行数不多时保留各点，超过 scatter_max_points 时
+    只保留二维直方图，绘图和传给子进程的数据量与行数无关
+    """
+    if len(df) <= VISUALIZE_CONFIG.get('scatter_max_points', 20000):
+        return {'votes_scores': df[['vote_count', 'score']], 'votes_density': None}
+    counts, vote_edges, score_edges = np.histogram2d(
+        df['vote_count'] / 10000, df['score'], bins=VISUALIZE_CONFIG.get('density_bins', 60))
+    return {'votes_scores': None, 'votes_density': (counts, vote_edges, score_edges)}
+
+
+def build_aggregates(df):
+    """一次算出所有图表和统计摘要需要的汇总结果，绘图时不再访问明细数据"""
+    scores = df['score'].dropna()
+    hist_counts, hist_edges = np.histogram(scores, bins=20)
+    return {
+        'score_hist': (hist_counts, hist_edges),
+        'score_mean': scores.mean(),
+        'category_counts': df['category'].value_counts(),
+        'region_counts': df['main_region'].value_counts().head(10),
+        'avg_score_by_category': df.groupby('category', observed=True)['score']
+                                   .mean().sort_values(ascending=False),
+        'top_movies': df.nlargest(TOP_N, 'score')[['title', 'score', 'category']],
+        **votes_vs_score_inputs(df),
+        'summary': {
+            'total': len(df),
+            'score_mean': df['score'].mean(),
+            'categories': df['category'].nunique(),
+            'regions': df['main_region'].nunique(),
+        },
+    }
+
+
+def plot_score_distribution(agg):
     plt.figure(figsize=(10, 6))
-    scores = df['score']
-    plt.hist(scores, bins=20, color='coral', edgecolor='white', alpha=0.7)
-    plt.axvline(scores.mean(), color='red', linestyle='--', label=f'平均: {scores.mean():.2f}')
+    counts, edges = agg['score_hist']
+    plt.hist(edges[:-1], bins=edges, weights=counts, color='coral', edgecolor='white', alpha=0.7)
+    plt.axvline(agg['score_mean'], color='red', linestyle='--', label=f"平均: {agg['score_mean']:.2f}")
     plt.xlabel('评分')
     plt.ylabel('电影数量')
     plt.title('豆瓣电影评分分布')
@@ -35,9 +101,9 @@ def plot_score_distribution(df):
     print(f"✓ 已生成 {OUTPUT_DIR}/score_distribution.png")
 
 
-def plot_category_distribution(df):
+def plot_category_distribution(agg):
     plt.figure(figsize=(12, 6))
-    cat_counts = df['category'].value_counts()
+    cat_counts = agg['category_counts']
     colors = plt.cm.Set3(range(len(cat_counts)))
     bars = plt.bar(range(len(cat_counts)), cat_counts.values, color=colors)
     plt.xticks(range(len(cat_counts)), cat_counts.index, rotation=45, ha='right')
@@ -53,9 +119,9 @@ def plot_category_distribution(df):
     print(f"✓ 已生成 {OUTPUT_DIR}/category_distribution.png")
 
 
-def plot_region_distribution(df):
+def plot_region_distribution(agg):
     plt.figure(figsize=(12, 6))
-    region_counts = df['main_region'].value_counts().head(10)
+    region_counts = agg['region_counts']
     colors = plt.cm.Pastel1(range(len(region_counts)))
     bars = plt.bar(range(len(region_counts)), region_counts.values, color=colors)
     plt.xticks(range(len(region_counts)), region_counts.index, rotation=45, ha='right')
@@ -71,9 +137,9 @@ def plot_region_distribution(df):
     print(f"✓ 已生成 {OUTPUT_DIR}/region_distribution.png")
 
 
-def plot_score_by_category(df):
+def plot_score_by_category(agg):
     plt.figure(figsize=(12, 6))
-    avg_score = df.groupby('category')['score'].mean().sort_values(ascending=False)
+    avg_score = agg['avg_score_by_category']
     colors = plt.cm.viridis(range(0, 256, int(256/len(avg_score))))
     bars = plt.bar(range(len(avg_score)), avg_score.values, color=colors)
     plt.xticks(range(len(avg_score)), avg_score.index, rotation=45, ha='right')
@@ -89,9 +155,9 @@ def plot_score_by_category(df):
     print(f"✓ 已生成 {OUTPUT_DIR}/score_by_category.png")
 
 
-def plot_top_movies(df, top_n=15):
+def plot_top_movies(agg, top_n=TOP_N):
     plt.figure(figsize=(12, 8))
-    top = df.nlargest(top_n, 'score')[['title', 'score', 'category']]
+    top = agg['top_movies'].head(top_n)
     colors = plt.cm.RdYlGn(range(50, 250, int(200/top_n)))[::-1]
     bars = plt.barh(range(len(top)), top['score'].values, color=colors)
     labels = [f"{row['title'][:15]} ({row['category']})" for _, row in top.iterrows()]
@@ -109,9 +175,17 @@ def plot_top_movies(df, top_n=15):
     print(f"✓ 已生成 {OUTPUT_DIR}/top_movies.png")
 
 
-def plot_votes_vs_score(df):
+def plot_votes_vs_score(agg):
     plt.figure(figsize=(10, 8))
-    plt.scatter(df['vote_count'] / 10000, df['score'], alpha=0.5, c='steelblue', s=30)
+    points = agg['votes_scores']
+    if points is not None:
+        plt.scatter(points['vote_count'] / 10000, points['score'], alpha=0.5, c='steelblue', s=30)
+    else:
+        counts, vote_edges, score_edges = agg['votes_density']
+        counts = np.ma.masked_equal(counts, 0)
+        mesh = plt.pcolormesh(vote_edges, score_edges, counts.T, cmap='Blues',
+                              norm=LogNorm(vmin=1, vmax=max(counts.max(), 1)))
+        plt.colorbar(mesh, label='电影数量')
     plt.xlabel('评价人数 (万)')
     plt.ylabel('评分')
     plt.title('电影评分与评价人数关系')
@@ -121,28 +195,85 @@ def plot_votes_vs_score(df):
     print(f"✓ 已生成 {OUTPUT_DIR}/votes_vs_score.png")
 
 
-def generate_stats(df):
+def generate_stats(agg):
+    summary = agg['summary']
     print("\n" + "="*50)
     print("数据统计摘要")
     print("="*50)
-    print(f"  电影总数: {len(df)}")
-    print(f"  平均评分: {df['score'].mean():.2f}")
-    print(f"  类型数量: {df['category'].nunique()}")
-    print(f"  地区数量: {df['main_region'].nunique()}")
+    print(f"  电影总数: {summary['total']}")
+    print(f"  平均评分: {summary['score_mean']:.2f}")
+    print(f"  类型数量: {summary['categories']}")
+    print(f"  地区数量: {summary['regions']}")
+
+
+# 图表名称与绘图函数，名称与 CHART_AGGREGATES 对应
+CHARTS = {
+    'score_distribution': plot_score_distribution,
+    'category_distribution': plot_category_distribution,
+    'region_distribution': plot_region_distribution,
+    'score_by_category': plot_score_by_category,
+    'top_movies': plot_top_movies,
+    'votes_vs_score': plot_votes_vs_score,
+}
+
+# 子进程中共享的汇总结果，由 _init_worker 设置
+_worker_agg = None
+
+
+def _init_worker(agg):
+    """子进程初始化：只接收一次汇总结果，之后各任务只传图表名称"""
+    global _worker_agg
+    plt.switch_backend('Agg')
+    _worker_agg = agg
+
+
+def _render_chart(name):
+    CHARTS[name](_worker_agg)
+    return name
+
+
+def render_charts(agg):
+    """按 VISUALIZE_CONFIG['workers'] 用多个进程并行生成图表，开启缓存时跳过没有变化的图表"""
+    started = time.perf_counter()
+    names = list(CHARTS)
+    cache = ChartCache(OUTPUT_DIR) if VISUALIZE_CONFIG.get('cache') else None
+    keys = {}
+    if cache:
+        params = {'matplotlib': matplotlib.__version__, 'rc': matplotlib.rcParams['font.sans-serif']}
+        keys = {name: cache.key(CHARTS[name], {key: agg[key] for key in CHART_AGGREGATES[name]}, params)
+                for name in names}
+        names = [name for name in names if not cache.is_fresh(name, keys[name])]
+
+    # 进程数不超过CPU核数，单核时直接逐个生成
+    workers = min(VISUALIZE_CONFIG.get('workers', 1), len(names), os.cpu_count() or 1)
+    if workers <= 1:
+        for name in names:
+            CHARTS[name](agg)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(agg,)) as pool:
+            list(pool.map(_render_chart, names))
+    if names:
+        used = f"{max(workers, 1)} 个进程，生成 {len(names)} 张"
+    else:
+        used = "0 个进程，全部复用"
+    print(f"图表生成耗时 {time.perf_counter() - started:.1f} 秒 ({used})")
+
+    if cache:
+        for name in names:
+            cache.record(name, keys[name])
+        cache.save()
+        cache.report()
 
 
 def main():
     print("开始生成可视化图表...")
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    df = load_data()
-    generate_stats(df)
+    df = load_data(sorted(set().union(*CHART_COLUMNS.values())))
+    agg = build_aggregates(df)
+    del df
+    generate_stats(agg)
     print("\n生成图表中...")
-    plot_score_distribution(df)
-    plot_category_distribution(df)
-    plot_region_distribution(df)
-    plot_score_by_category(df)
-    plot_top_movies(df)
-    plot_votes_vs_score(df)
+    render_charts(agg)
     print("\n" + "="*50)
     print("可视化完成！")
     print("="*50)